@@ -0,0 +1,356 @@
+"""annotate.py
+
+Annotates a tokenized and tagged corpus with VerbnetGL frames. Like the other
+scripts this needs config.py to find the VerbNet sources.
+
+Usage:
+
+$ python annotate.py [-d] [-f FILELIST] [-w WORKERS] [-b BATCH] [--penn] [FILE]
+
+    Reads sentences from FILE, or from the standard input if there is no FILE,
+    and writes one JSON object per line to the standard output for each verb
+    that is a member of a VerbNet class. Messages from loading VerbNet are
+    written to the standard error.
+
+    The -d and -f options restrict the VerbNet classes used, just like for
+    verbnetgl.py. With -w the sentences are annotated by a pool of WORKERS
+    processes, in batches of BATCH sentences (default is 100). The output is
+    the same as without -w.
+
+The input has one token per line with sentences separated by empty lines.
+Lines can be in CoNLL format, with the token number, token, lemma and the tags
+in the first five tab-separated columns, or have a token, a tag and optionally
+a lemma separated by tabs. Lines starting with # are skipped. Tags are from
+the TreeTagger tagset, which is used by the slurp functions of restrictions.py
+that group the tokens into phrases, use --penn to read Penn Treebank tags.
+
+Verbs are looked up by their lemma, or by their form if there is no lemma,
+using the MemberIndex of VerbnetGL. Frames of the classes of the verb, and of
+their superclasses, match if their subcat elements line up with the phrases
+around the verb and cover the clause of the verb, which ends at the next verb
+phrase or at the end of the sentence, not counting phrases without category
+at its end. The subcats of all frames are compiled into one SubcatAutomaton
+that finds the matching frames of all verbs in a sentence with one scan over
+its phrases. Each output object has the sentence number, the verb, its token
+number, the phrases of the sentence and a list with a result for each class
+of the verb:
+
+    {"sentence": 1, "token": 1, "verb": "slid", "lemma": "slide",
+     "phrases": "NP VERB NP PREP NP",
+     "classes": [{"class": "slide-11.2", "path": [], "frames": [...]}]}
+
+Each matching frame has the class it is from, its description, the subcat,
+the token span it matched and the qualia and event structure.
+
+The pipeline runs on generators, so only one batch of sentences per worker is
+in memory at a time. The VerbnetGL model is loaded once and handed to the
+workers when the pool starts, on platforms that fork new processes the
+workers share the memory of the model.
+
+"""
+
+import sys
+import json
+import getopt
+import contextlib
+import collections
+import multiprocessing
+
+from verbnetgl import VerbnetGL
+from restrictions import slurp_VERB, slurp_NP, slurp_PREP, slurp_ADV, slurp_ADJ
+from utils.subcats import SubcatAutomaton
+from utils.search import iter_classes
+
+
+# The slurp functions tried at each token, in this order. A token that is not
+# consumed by any of them becomes a phrase without category.
+CHUNKERS = [('VERB', slurp_VERB), ('NP', slurp_NP), ('PREP', slurp_PREP),
+            ('ADV', slurp_ADV), ('ADJ', slurp_ADJ)]
+
+# Penn Treebank tags that are different in the TreeTagger tagset
+PENN_TAGS = {'VB': 'VV', 'VBD': 'VVD', 'VBG': 'VVG', 'VBN': 'VVN',
+             'VBP': 'VVP', 'VBZ': 'VVZ', 'NNP': 'NP', 'NNPS': 'NPS',
+             'PRP': 'PP', 'PRP$': 'PP$', '.': 'SENT'}
+
+NO_LEMMA = ('_', '<unknown>', '')
+
+
+class Annotator(object):
+
+    """Finds the classes and frames of the verbs in a sentence. The frames
+    dictionary has the frames of each class and subclass, including the frames
+    inherited from superclasses, as a list of triples of a frame, the number
+    of its first VERB element and the part of its JSON output that does not
+    depend on the sentence. The automaton has the frames of all classes and
+    the verbs dictionary has the number of the first VERB element of each of
+    those frames."""
+
+    def __init__(self, vngl):
+        self.lemmas = vngl.lemmas
+        self.frames = {}
+        for vc in vngl.classes:
+            self._add_frames(vc, [])
+        frames = [frame for vc in iter_classes(vngl.classes) for frame in vc.frames]
+        self.automaton = SubcatAutomaton(frames)
+        self.verbs = {frame: verb_element(frame) for frame in frames}
+
+    def __str__(self):
+        return "<Annotator classes=%s lemmas=%s>" % (len(self.frames), len(self.lemmas))
+
+    def _add_frames(self, vc, inherited):
+        frames = inherited + [(frame, verb_element(frame), frame_json(frame))
+                              for frame in vc.frames]
+        self.frames[vc.ID] = frames
+        for subclass in vc.subclasses:
+            self._add_frames(subclass, frames)
+
+    def lookup(self, token, lemma):
+        """Return the member entries for the verb, using the lemma if there is
+        one and the inflected form otherwise."""
+        if lemma is not None:
+            entries = self.lemmas.get(lemma)
+            if entries:
+                return entries
+        return self.lemmas.get_form(token)
+
+    def annotate(self, number, sentence):
+        """Return a list with an annotation for each verb in the sentence that is
+        a member of a VerbNet class, the sentence is a list of (token, tag,
+        lemma) triples."""
+        annotations = []
+        phrases = chunk(sentence)
+        matches = None
+        for position, (cat, start, end) in enumerate(phrases):
+            if cat != 'VERB':
+                continue
+            head = verb_head(sentence, start, end)
+            token, tag, lemma = sentence[head]
+            entries = self.lookup(token, lemma)
+            if not entries:
+                continue
+            if matches is None:
+                matches = self.scan(sentence, phrases)
+            classes = []
+            for entry in entries:
+                frames = []
+                for json_object, span in self.match(entry.verbclass.ID,
+                                                    matches, position):
+                    frames.append(dict(json_object, span=[phrases[span[0]][1],
+                                                          phrases[span[1] - 1][2]]))
+                classes.append({'class': entry.class_ID, 'path': list(entry.path),
+                                'frames': frames})
+            annotations.append({
+                'sentence': number, 'token': head, 'verb': token,
+                'lemma': entries[0].member.name,
+                'phrases': ' '.join([str(p[0]) for p in phrases]),
+                'classes': classes})
+        return annotations
+
+    def scan(self, sentence, phrases):
+        """Return a dictionary from the frames that occur in the phrases and the
+        phrase numbers of their verbs to the spans of phrases they matched.
+        Only occurrences that end where the clause of their verb ends are
+        included."""
+        symbols = []
+        for cat, start, end in phrases:
+            text = None
+            if cat == 'PREP':
+                text = '_'.join([sentence[i][0].lower() for i in range(start, end)])
+            symbols.append((cat, text))
+        ends = clause_ends(phrases)
+        matches = {}
+        for start, end, frame in self.automaton.scan(symbols):
+            verb = self.verbs[frame]
+            if verb is not None and ends.get(start + verb) == end:
+                matches[(frame, start + verb)] = (start, end)
+        return matches
+
+    def match(self, class_ID, matches, position):
+        """Return the frames of the class that matched the phrases with the verb of
+        the frame at the given position, as pairs of the JSON object of a frame
+        and the span of phrases that it matched."""
+        found = []
+        for frame, verb, json_object in self.frames[class_ID]:
+            span = matches.get((frame, position))
+            if span is not None:
+                found.append((json_object, span))
+        return found
+
+    def annotate_batch(self, batch):
+        """Return the annotations for a list of numbered sentences."""
+        annotations = []
+        for number, sentence in batch:
+            annotations.extend(self.annotate(number, sentence))
+        return annotations
+
+
+def clause_ends(phrases):
+    """Return a dictionary from the phrase numbers of the VERB phrases to the
+    phrase number plus one of the last phrase of their clause. A clause ends
+    before the next VERB phrase or at the end of the sentence, and phrases
+    without category at the end of a clause are not part of it."""
+    verbs = [i for i, phrase in enumerate(phrases) if phrase[0] == 'VERB']
+    ends = {}
+    for verb, next_verb in zip(verbs, verbs[1:] + [len(phrases)]):
+        end = next_verb
+        while end > verb + 1 and phrases[end - 1][0] is None:
+            end -= 1
+        ends[verb] = end
+    return ends
+
+
+def verb_element(frame):
+    """Return the number of the first VERB element in the subcat of the frame, or
+    None if there is none."""
+    for i, element in enumerate(frame.subcat):
+        if element.cat == 'VERB':
+            return i
+    return None
+
+
+def frame_json(frame):
+    return {'class': frame.glverbclass.ID,
+            'frame': frame.vnframe.description,
+            'subcat': [[e.cat, e.role] for e in frame.subcat],
+            'qualia': str(frame.qualia),
+            'events': str(frame.events)}
+
+
+def chunk(sentence):
+    """Group the tokens of the sentence into phrases, using the slurp functions
+    from restrictions.py. Returns a list of (category, start, end) triples."""
+    lexes = [(token, tag) for token, tag, lemma in sentence]
+    phrases = []
+    idx = 0
+    while idx < len(lexes):
+        for cat, slurp_function in CHUNKERS:
+            end = slurp_function(lexes, idx)
+            if end > idx:
+                break
+        else:
+            cat, end = None, idx + 1
+        phrases.append((cat, idx, end))
+        idx = end
+    return phrases
+
+
+def verb_head(sentence, start, end):
+    """Return the number of the last lexical verb in the phrase, or of the last
+    token if there is no lexical verb."""
+    for i in range(end - 1, start - 1, -1):
+        if sentence[i][1].startswith('VV'):
+            return i
+    return end - 1
+
+
+def read_sentences(lines, penn=False):
+    """Generate sentences from lines in CoNLL or token-tag-lemma format. Each
+    sentence is a list of (token, tag, lemma) triples where lemma is None if
+    the input did not have a lemma."""
+    sentence = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line.strip():
+            if sentence:
+                yield sentence
+                sentence = []
+            continue
+        if line.startswith('#'):
+            continue
+        fields = line.split('\t') if '\t' in line else line.split()
+        if len(fields) >= 5:
+            if not fields[0].isdigit():
+                # multi-word tokens and empty nodes of CoNLL-U
+                continue
+            token, lemma = fields[1], fields[2]
+            tag = fields[4] if fields[4] != '_' else fields[3]
+        elif len(fields) >= 2:
+            token, tag = fields[0], fields[1]
+            lemma = fields[2] if len(fields) > 2 else None
+        else:
+            print("Warning: skipping line without tag: %s" % line, file=sys.stderr)
+            continue
+        if penn:
+            tag = PENN_TAGS.get(tag, tag)
+        if lemma in NO_LEMMA:
+            lemma = None
+        sentence.append((token, tag, lemma.lower() if lemma is not None else None))
+    if sentence:
+        yield sentence
+
+
+def batches(iterable, size):
+    """Generate lists of up to size items from the iterable."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def annotate_corpus(annotator, sentences, workers=None, batch_size=100):
+    """Generate the annotations of the sentences, in the order of the sentences.
+    Sentences are numbered from 1. If workers is larger than 1 the batches
+    are handed to a pool of processes, with at most two batches per worker
+    waiting for or being annotated."""
+    numbered = batches(enumerate(sentences, 1), batch_size)
+    if workers is None or workers < 2:
+        for batch in numbered:
+            yield from annotator.annotate_batch(batch)
+        return
+    with multiprocessing.Pool(workers, _set_annotator, (annotator,)) as pool:
+        pending = collections.deque()
+        for batch in numbered:
+            pending.append(pool.apply_async(_annotate_batch, (batch,)))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+
+# The annotator of a worker process, set when the pool starts
+ANNOTATOR = None
+
+
+def _set_annotator(annotator):
+    global ANNOTATOR
+    ANNOTATOR = annotator
+
+
+def _annotate_batch(batch):
+    return ANNOTATOR.annotate_batch(batch)
+
+
+def read_options():
+    debug_mode = False
+    filelist = None
+    workers = None
+    batch_size = 100
+    penn = False
+    opts, args = getopt.getopt(sys.argv[1:], 'df:w:b:', ['penn'])
+    for opt, arg in opts:
+        if opt == '-d':
+            debug_mode = True
+        if opt == '-f':
+            filelist = arg
+        if opt == '-w':
+            workers = int(arg)
+        if opt == '-b':
+            batch_size = int(arg)
+        if opt == '--penn':
+            penn = True
+    return args, debug_mode, filelist, workers, batch_size, penn
+
+
+if __name__ == '__main__':
+
+    args, debug_mode, filelist, workers, batch_size, penn = read_options()
+    with contextlib.redirect_stdout(sys.stderr):
+        annotator = Annotator(VerbnetGL(debug_mode, filelist, workers))
+    fh = open(args[0]) if args else sys.stdin
+    sentences = read_sentences(fh, penn)
+    for annotation in annotate_corpus(annotator, sentences, workers, batch_size):
+        sys.stdout.write(json.dumps(annotation) + "\n")
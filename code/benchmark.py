@@ -0,0 +1,498 @@
+"""benchmark.py
+
+Benchmarks for loading VerbNet and creating the VerbnetGL classes. Like the
+other scripts this needs config.py to find the VerbNet sources.
+
+Usage:
+
+$ python benchmark.py [-l LIMIT] [-r RUNS] parsers
+
+    Compares the bs4 and lxml parser backends of verbnet.VerbNet, reporting
+    the best loading time of RUNS runs (default is 3) and checking that both
+    backends create identical classes. LIMIT restricts the number of VerbNet
+    files loaded, the default is to load all of them.
+
+$ python benchmark.py [-l LIMIT] [-r RUNS] [-p PARSER] workers
+
+    Loads VerbNet with 1, 2, 4, ... worker processes up to the number of cores,
+    reporting the best time and the speedup over a serial load. PARSER is the
+    parser backend, the default is bs4.
+
+$ python benchmark.py [-l LIMIT] [-r RUNS] [-p PARSER] cache
+
+    Compares loading VerbNet without a cache, with an empty cache and with a
+    cache that is up to date. Uses a temporary cache file.
+
+$ python benchmark.py [-l LIMIT] [-r RUNS] [-p PARSER] lazy
+
+    Compares the time needed to load VerbNet and look at the frames of one
+    class, with eager loading and with lazy loading.
+
+$ python benchmark.py [-l LIMIT] [-r RUNS] [-p PARSER] archive
+
+    Compares loading VerbNet from the directory with loading it from a zip
+    archive and from a gzipped tar archive. The archives are created in a
+    temporary directory.
+
+$ python benchmark.py [-l LIMIT] memory
+
+    Reports the growth in resident memory caused by loading VerbNet, for both
+    parser backends and with and without keeping the soups. Each load is done
+    in a fresh process.
+
+$ python benchmark.py [-l LIMIT] [-r RUNS] [-n TOKENS] lemmas
+
+    Builds the member index and looks up a stream of TOKENS verbs (default is a
+    million), reporting the time per lemma. About one in five tokens is not a
+    member. Also reports the time per lemma for scanning the member names of
+    all classes and subclasses, measured on the first thousand tokens, and the
+    time per token for lemmatizing inflected forms and for finding similar
+    names of a thousand misspelled members of at least four characters.
+
+$ python benchmark.py [-l LIMIT] slots
+
+    Reports the number of bytes used per instance for the classes that use
+    slots, compared to the bytes used by a regular class with the same
+    attributes. Attribute values are not included since they are shared.
+
+$ python benchmark.py [-l LIMIT] [-r RUNS] [-n TOKENS] subcats
+
+    Matches TOKENS/100 phrase sequences (default is ten thousand) against the
+    subcats of all frames, once by trying every frame at every position and
+    once with a SubcatAutomaton, reporting the time per sequence and checking
+    that both find the same matches. Sequences are made from the subcats of
+    random frames with some phrases added before and after.
+
+"""
+
+import os
+import sys
+import gc
+import time
+import getopt
+import contextlib
+import io
+import tempfile
+import zipfile
+import tarfile
+import random
+import resource
+import tracemalloc
+import multiprocessing
+
+import verbnet
+import verbnetgl
+from utils import formula
+from utils.members import MemberIndex
+from utils.subcats import SubcatAutomaton, subcat_pattern
+from utils.search import iter_classes
+
+
+def timed(function, runs):
+    """Run function the given number of times and return the result of the
+    last run and the best time in seconds. Anything printed by the function is
+    suppressed."""
+    best = None
+    result = None
+    for i in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            result = function()
+            t1 = time.perf_counter()
+        best = t1 - t0 if best is None else min(best, t1 - t0)
+    return result, best
+
+
+def resident_memory():
+    """Return the resident memory of this process in bytes. This uses /proc where
+    available and falls back to the peak resident memory elsewhere."""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def memory_used(kwargs):
+    """Create a VerbNet instance with the given keyword arguments in a fresh
+    process and return the growth of the resident memory of that process. The
+    process is spawned rather than forked so it does not inherit the heap of
+    this process."""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_memory_used, args=(kwargs, queue))
+    process.start()
+    used = queue.get()
+    process.join()
+    return used
+
+
+def _memory_used(kwargs, queue):
+    gc.collect()
+    before = resident_memory()
+    with contextlib.redirect_stdout(io.StringIO()):
+        vn = verbnet.VerbNet(**kwargs)
+    gc.collect()
+    queue.put(resident_memory() - before)
+
+
+def class_signature(vc):
+    """Return a nested tuple with all the information of a verbnet.VerbClass,
+    used to compare the results of the parser backends."""
+    def restrictions(res):
+        return (res.logic, tuple(str(r) for r in res.restrictions))
+    return (
+        vc.ID,
+        tuple((m.name, m.wn, m.grouping) for m in vc.members),
+        tuple((r.role_type, restrictions(r.sel_restrictions)) for r in vc.roles),
+        tuple((f.description,
+               tuple(f.examples),
+               tuple((s.pos, s.value, restrictions(s.restrictions))
+                     for s in f.syntax),
+               tuple((p.value, tuple(p.args)) for p in f.predicates))
+              for f in vc.frames),
+        tuple(class_signature(sub) for sub in vc.subclasses))
+
+
+def benchmark_parsers(limit, runs):
+    results = {}
+    for parser in verbnet.PARSERS:
+        vn, seconds = timed(lambda: verbnet.VerbNet(limit=limit, parser=parser), runs)
+        results[parser] = [class_signature(vc) for vc in vn.classes]
+        print("%-6s %3d classes  %8.3fs" % (parser, len(vn.classes), seconds))
+    identical = len(set(str(sigs) for sigs in results.values())) == 1
+    print("identical output: %s" % identical)
+
+
+def benchmark_workers(limit, runs, parser):
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    serial = None
+    signatures = set()
+    for workers in counts:
+        vn, seconds = timed(
+            lambda: verbnet.VerbNet(limit=limit, parser=parser, workers=workers),
+            runs)
+        serial = seconds if serial is None else serial
+        signatures.add(str([class_signature(vc) for vc in vn.classes]))
+        print("%2d workers %3d classes  %8.3fs  speedup %5.2f"
+              % (workers, len(vn.classes), seconds, serial / seconds))
+    print("identical output: %s" % (len(signatures) == 1))
+
+
+def benchmark_cache(limit, runs, parser):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = os.path.join(tmpdir, 'cache.pickle')
+        def load(cache):
+            return verbnet.VerbNet(limit=limit, parser=parser, cache=cache)
+        vn1, seconds1 = timed(lambda: load(False), runs)
+        vn2, seconds2 = timed(lambda: load(cache), 1)
+        vn3, seconds3 = timed(lambda: load(cache), runs)
+        print("no cache    %3d classes  %8.3fs" % (len(vn1.classes), seconds1))
+        print("cold cache  %3d classes  %8.3fs" % (len(vn2.classes), seconds2))
+        print("warm cache  %3d classes  %8.3fs" % (len(vn3.classes), seconds3))
+        print("cache size  %d bytes" % os.path.getsize(cache))
+        signatures = [str([class_signature(vc) for vc in vn.classes])
+                      for vn in (vn1, vn2, vn3)]
+        print("identical output: %s" % (len(set(signatures)) == 1))
+
+
+def benchmark_lazy(limit, runs, parser):
+    def lookup(lazy):
+        vn = verbnet.VerbNet(limit=limit, parser=parser, lazy=lazy)
+        return vn, len(vn.classes[-1].frames)
+    (vn1, frames), seconds1 = timed(lambda: lookup(False), runs)
+    (vn2, frames), seconds2 = timed(lambda: lookup(True), runs)
+    print("eager  %3d classes  %8.3fs" % (len(vn1.classes), seconds1))
+    print("lazy   %3d classes  %8.3fs" % (len(vn2.classes), seconds2))
+    signatures = [str([class_signature(vc) for vc in vn.classes])
+                  for vn in (vn1, vn2)]
+    print("identical output: %s" % (len(set(signatures)) == 1))
+
+
+def benchmark_archive(limit, runs, parser):
+    fnames = [f for f in os.listdir(verbnet.VERBNET_PATH) if f.endswith('.xml')]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, 'verbnet.zip')
+        tar_path = os.path.join(tmpdir, 'verbnet.tar.gz')
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for fname in fnames:
+                archive.write(os.path.join(verbnet.VERBNET_PATH, fname), fname)
+        with tarfile.open(tar_path, 'w:gz') as archive:
+            for fname in fnames:
+                archive.add(os.path.join(verbnet.VERBNET_PATH, fname), fname)
+        signatures = set()
+        for name, path in (('directory', verbnet.VERBNET_PATH),
+                           ('zip', zip_path), ('tar.gz', tar_path)):
+            vn, seconds = timed(
+                lambda: verbnet.VerbNet(limit=limit, parser=parser, path=path),
+                runs)
+            signatures.add(str([class_signature(vc) for vc in vn.classes]))
+            print("%-10s %3d classes  %8.3fs" % (name, len(vn.classes), seconds))
+        print("identical output: %s" % (len(signatures) == 1))
+
+
+def benchmark_memory(limit):
+    mb = 1024 * 1024
+    for parser in verbnet.PARSERS:
+        used = {}
+        for keep_soup in (True, False):
+            used[keep_soup] = memory_used(
+                {'limit': limit, 'parser': parser, 'keep_soup': keep_soup})
+            print("%-6s keep_soup=%-5s  %8.1fMB"
+                  % (parser, keep_soup, used[keep_soup] / mb))
+        saving = used[True] - used[False]
+        print("%-6s saving           %8.1fMB (%.0f%%)"
+              % (parser, saving / mb, 100.0 * saving / max(1, used[True])))
+
+
+def benchmark_lemmas(limit, runs, tokens):
+    with contextlib.redirect_stdout(io.StringIO()):
+        vn = verbnet.VerbNet(limit=limit, keep_soup=False)
+    index, seconds = timed(lambda: MemberIndex(vn.classes), runs)
+    print("index      %6d names   %8.3fs" % (len(index), seconds))
+    names = index.names()
+    generator = random.Random(0)
+    stream = [generator.choice(names) if generator.random() < 0.8
+              else generator.choice(names) + 'x' for i in range(tokens)]
+    results, seconds = timed(lambda: index.lookup(stream), runs)
+    found = sum(1 for entries in results if entries)
+    print("lookup     %6d tokens  %8.3fs  %6.0fns per lemma  %d found"
+          % (tokens, seconds, 1e9 * seconds / tokens, found))
+    sample = stream[:1000]
+    def scan():
+        return [[vc for vc in iter_classes(vn.classes) if name in vc.member_names]
+                for name in sample]
+    results, seconds = timed(scan, 1)
+    print("scan       %6d tokens  %8.3fs  %6.0fns per lemma"
+          % (len(sample), seconds, 1e9 * seconds / len(sample)))
+    forms = sorted(index.forms.forms)
+    inflected = [generator.choice(forms) for i in range(tokens)]
+    results, seconds = timed(lambda: [index.get_form(form) for form in inflected], runs)
+    found = sum(1 for entries in results if entries)
+    print("forms      %6d tokens  %8.3fs  %6.0fns per token   %d found"
+          % (tokens, seconds, 1e9 * seconds / tokens, found))
+    # shorter names have too few trigrams left after an edit to be found
+    long_names = [name for name in names if len(name) >= 4]
+    sample = [generator.choice(long_names) for i in range(1000)]
+    misspelled = [misspell(generator, name) for name in sample]
+    results, seconds = timed(lambda: [index.similar(word) for word in misspelled], runs)
+    found = sum(1 for word, pairs in zip(sample, results)
+                if pairs and pairs[0][0] == word)
+    print("similar    %6d tokens  %8.3fs  %6.0fus per token   %d found"
+          % (len(sample), seconds, 1e6 * seconds / len(sample), found))
+
+
+def misspell(generator, word):
+    """Drop, double or swap a character that is not the first one. Words with
+    less than three characters have nothing to swap, their last character is
+    doubled.
+
+    >>> generator = random.Random(0)
+    >>> misspell(generator, 'carry')
+    'carrry'
+    >>> [misspell(generator, word) for word in ['go', 'a', '']]
+    ['goo', 'aa', '']
+
+    """
+    if len(word) < 3:
+        return word + word[-1:]
+    i = generator.randrange(1, len(word) - 1)
+    edit = generator.choice(['drop', 'double', 'swap'])
+    if edit == 'drop':
+        return word[:i] + word[i+1:]
+    if edit == 'double':
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + word[i+1] + word[i] + word[i+2:]
+
+
+def benchmark_subcats(limit, runs, sequences):
+    with contextlib.redirect_stdout(io.StringIO()):
+        vn = verbnet.VerbNet(limit=limit, keep_soup=False)
+        glclasses = [verbnetgl.GLVerbClass(vc) for vc in vn.classes]
+    frames = [frame for vc in iter_classes(glclasses) for frame in vc.frames]
+    automaton, seconds = timed(lambda: SubcatAutomaton(frames), runs)
+    print("compile    %6d frames   %8.3fs  %d nodes"
+          % (len(frames), seconds, len(automaton.edges)))
+    generator = random.Random(0)
+    phrases = [random_phrases(generator, generator.choice(frames))
+               for i in range(sequences)]
+    patterns = [(frame, subcat_pattern(frame)) for frame in frames]
+    def scan_frames():
+        return [scan_patterns(automaton, patterns, p) for p in phrases]
+    def scan_automaton():
+        return [automaton.scan(p) for p in phrases]
+    results1, seconds = timed(scan_frames, 1)
+    print("frames     %6d phrases  %8.3fs  %6.0fus per sequence"
+          % (sequences, seconds, 1e6 * seconds / sequences))
+    results2, seconds = timed(scan_automaton, runs)
+    found = sum(len(matches) for matches in results2)
+    print("automaton  %6d phrases  %8.3fs  %6.0fus per sequence  %d matches"
+          % (sequences, seconds, 1e6 * seconds / sequences, found))
+    def normalized(results):
+        return [sorted([(start, end, id(frame)) for start, end, frame in matches])
+                for matches in results]
+    if normalized(results1) != normalized(results2):
+        print("Warning: the automaton and the frames found different matches")
+
+
+def random_phrases(generator, frame):
+    """Return the phrases for the subcat of a frame with up to two phrases added
+    before and after it."""
+    extra = [('NP', None), ('ADV', None), ('PREP', 'with'), (None, None)]
+    phrases = [generator.choice(extra) for i in range(generator.randint(0, 2))]
+    for element in frame.subcat:
+        text = None
+        if element.cat == 'PREP':
+            text = generator.choice((element.role or 'in').lower().split())
+        phrases.append((element.cat, text))
+    phrases.extend([generator.choice(extra) for i in range(generator.randint(0, 2))])
+    return phrases
+
+
+def scan_patterns(automaton, patterns, phrases):
+    """Return the (start, end, frame) triples of all occurrences of the patterns
+    in the phrases by trying each pattern at each position."""
+    symbols = [automaton.symbol(phrase) for phrase in phrases]
+    matches = []
+    for frame, pattern in patterns:
+        for start in range(len(symbols) - len(pattern) + 1):
+            for (cat, prepositions), (phrase_cat, candidates) \
+                    in zip(pattern, symbols[start:]):
+                if cat != phrase_cat:
+                    break
+                if prepositions is not None and not prepositions & candidates:
+                    break
+            else:
+                matches.append((start, start + len(pattern), frame))
+    return matches
+
+
+def benchmark_slots(limit):
+    with contextlib.redirect_stdout(io.StringIO()):
+        vn = verbnet.VerbNet(limit=limit, keep_soup=False)
+        glclasses = [verbnetgl.GLVerbClass(vc) for vc in vn.classes]
+    instances = collect_instances(glclasses)
+    total_slotted = total_plain = 0
+    print("%-16s %8s %10s %10s" % ('class', 'count', 'before', 'after'))
+    for cls in (verbnet.Member, verbnet.Predicate, verbnet.SyntacticRole,
+                verbnet.Restriction, verbnetgl.SubcatElement,
+                formula.Var, formula.Pred):
+        objects = instances.get(cls, [])
+        if not objects:
+            continue
+        names = [name for c in cls.__mro__ for name in c.__dict__.get('__slots__', ())]
+        values = [[getattr(obj, name) for name in names] for obj in objects]
+        plain_class = type('Plain' + cls.__name__, (object,), {})
+        before = bytes_per_object(plain_class, names, values)
+        after = bytes_per_object(cls, names, values)
+        total_plain += before * len(objects)
+        total_slotted += after * len(objects)
+        print("%-16s %8d %9.1fB %9.1fB" % (cls.__name__, len(objects), before, after))
+    print("%-16s %8s %9.1fK %9.1fK"
+          % ('total', '', total_plain / 1024, total_slotted / 1024))
+
+
+def bytes_per_object(cls, names, values):
+    """Return the average number of bytes allocated for an instance of cls, where
+    each instance is created without calling __init__ and then has the given
+    attributes set to the given values."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = []
+    for object_values in values:
+        obj = cls.__new__(cls)
+        for name, value in zip(names, object_values):
+            setattr(obj, name, value)
+        objects.append(obj)
+    used = tracemalloc.get_traced_memory()[0] - before - sys.getsizeof(objects)
+    tracemalloc.stop()
+    return used / len(objects)
+
+
+def collect_instances(glclasses):
+    """Return a dictionary with for each of the classes that use slots all the
+    instances found in the GLVerbClasses and their subclasses. Subclasses of
+    formula.Pred are counted as instances of formula.Pred."""
+    instances = {}
+    def add(obj):
+        cls = formula.Pred if isinstance(obj, formula.Pred) else obj.__class__
+        instances.setdefault(cls, []).append(obj)
+    def add_formula(obj):
+        add(obj)
+        if isinstance(obj, formula.Pred):
+            for f in obj.formulas:
+                add_formula(f)
+        elif isinstance(obj, formula.Not):
+            add_formula(obj.formula)
+        elif isinstance(obj, verbnetgl.Opposition):
+            add_formula(obj.pred1)
+            add_formula(obj.pred2)
+    def add_class(glclass):
+        for member in glclass.members:
+            add(member)
+        for role in glclass.verbclass.roles:
+            for restriction in role.sel_restrictions.restrictions:
+                add(restriction)
+        for frame in glclass.frames:
+            for pred in frame.vnframe.predicates:
+                add(pred)
+            for synrole in frame.vnframe.syntax:
+                add(synrole)
+                for restriction in synrole.restrictions.restrictions:
+                    add(restriction)
+            for element in frame.subcat:
+                add(element)
+            for f in frame.qualia.formulas + frame.events.formulas:
+                add_formula(f)
+        for subclass in glclass.subclasses:
+            add_class(subclass)
+    for glclass in glclasses:
+        add_class(glclass)
+    return instances
+
+
+def read_options():
+    limit = None
+    runs = 3
+    parser = 'bs4'
+    tokens = 1000000
+    opts, args = getopt.getopt(sys.argv[1:], 'l:r:p:n:', [])
+    for opt, arg in opts:
+        if opt == '-l':
+            limit = int(arg)
+        if opt == '-r':
+            runs = int(arg)
+        if opt == '-p':
+            parser = arg
+        if opt == '-n':
+            tokens = int(arg)
+    return args, limit, runs, parser, tokens
+
+
+if __name__ == '__main__':
+
+    args, limit, runs, parser, tokens = read_options()
+    if 'parsers' in args:
+        benchmark_parsers(limit, runs)
+    if 'workers' in args:
+        benchmark_workers(limit, runs, parser)
+    if 'cache' in args:
+        benchmark_cache(limit, runs, parser)
+    if 'lazy' in args:
+        benchmark_lazy(limit, runs, parser)
+    if 'archive' in args:
+        benchmark_archive(limit, runs, parser)
+    if 'memory' in args:
+        benchmark_memory(limit)
+    if 'lemmas' in args:
+        benchmark_lemmas(limit, runs, tokens)
+    if 'slots' in args:
+        benchmark_slots(limit)
+    if 'subcats' in args:
+        benchmark_subcats(limit, runs, tokens // 100)
@@ -1,4 +1,5 @@
 
-# Set the path to where your VerbNet files live
+# Set the path to where your VerbNet files live, this can be a directory or a
+# zip or tar archive with the files
 
 VERBNET_PATH = '/DATA/resources/lexicons/verbnet/verbnet-3.3'
@@ -10,15 +10,17 @@ image search function in verbnetgl.py
 The main function is create_schema_to_verbnet_mappings(), which creates a bunch
 of html pages with mappings between image schema and VerbNet.
 
-TODO: this is now out-of-sync with the verbnet code so it gives errors
+All searches for the schemes in SCHEME_LIST are done by one ImageSearchEngine,
+which matches all frames against all schemes in one pass, and the three html
+reports are created from its results.
 
 """
 
 from verbnet import VerbNet
 import verbnetgl
 from utils.writer import HtmlClassWriter
-from utils.search import search_by_ID
-from utils.search import reverse_image_search, image_schema_search, image_schema_search2
+from utils.search import IDIndex, ImageSearchEngine, frame_order
+from utils.search import image_schema_search2
 
 
 class ImageScheme(object):
@@ -77,8 +79,11 @@ SCHEME_LIST = [
 # cannot be moved as is because of dependencies to methods in this file. Some
 # refactoring is needed.
 
-def pp_image_search_html(verbclasslist, results):
+def pp_image_search_html(verbclasslist, results, engine=None):
     """Uses a list of [image_search_name, search_results]"""
+    if engine is None:
+        engine = ImageSearchEngine([scheme for scheme, _ in results], verbclasslist)
+    index = IDIndex(verbclasslist)
     INDEX = open('html/image_search_index.html', 'w')
     pp_html_begin(INDEX)
     for result in results:
@@ -87,24 +92,12 @@ def pp_image_search_html(verbclasslist, results):
         INDEX.write("<tr class=header><td>PP List: %s</a>\n" % scheme.pp_list)
         INDEX.write("<tr class=header><td>Selectional Restrictions: %s</a>\n" % scheme.sel_res_list)
         INDEX.write("<tr class=header><td>Thematic Roles: %s</a>\n" % scheme.role_list)
-        if len(results[1]) == 0:
+        if len(result[1]) == 0:
             INDEX.write("<tr class=body><td>No Results\n")
         for vc_id, class_results in result[1]:
             id_dict = {}
-            for frame,frame_num,ID in class_results:
-                results_type = []
-                for member in frame.subcat:
-                    if member.cat == "PREP":
-                        if len(member.role) > 0:
-                            if member.role[0] in scheme.pp_list:
-                                results_type.append("PP")
-                        if len(member.sel_res) > 0:
-                            for res in member.sel_res:
-                                if res in scheme.sel_res_list:
-                                    results_type.append("SR")
-                    if len(member.role) > 0:
-                        if member.role[0] in scheme.role_list:
-                            results_type.append("TR")
+            for frame,frame_num,ID in sorted(class_results, key=frame_order):
+                results_type = engine.match_types(frame, scheme)
                 if ID in id_dict:
                     id_dict[ID].append((frame_num, results_type))
                 else:
@@ -119,21 +112,25 @@ def pp_image_search_html(verbclasslist, results):
                         INDEX.write("<sup>%s</sup> " % result)
                     INDEX.write("&emsp;")
                 VNCLASS = open("html/%s" % class_file, 'w')
-                verbclass = search_by_ID(verbclasslist, ID)
+                verbclass = index.lookup(ID)
                 class_writer = HtmlClassWriter(VNCLASS, verbclass)
                 frame_numbers = sorted([num for num,type in id_dict[ID]])
                 class_writer.write(frames=frame_numbers)
     pp_html_end(INDEX)
 
 
-def pp_reverse_image_search_html(verbclasslist, frame_list, scheme_list):
+def pp_reverse_image_search_html(verbclasslist, frame_list, scheme_list,
+                                 engine=None):
+    if engine is None:
+        engine = ImageSearchEngine(scheme_list, verbclasslist)
+    index = IDIndex(verbclasslist)
     INDEX = open('html/image_search_reverse_index.html', 'w')
     pp_html_begin(INDEX)
     INDEX.write("<tr class=header><td>Reverse Image Search Results:\n</a>")
-    for frame,frame_num,ID in sorted(set(frame_list)):
+    for frame,frame_num,ID in sorted(set(frame_list), key=frame_order):
         results = []
         for scheme in scheme_list:
-            if reverse_image_search(frame, scheme):
+            if engine.reverse_search(frame, scheme):
                 results.append(scheme.name)
         INDEX.write("<tr class=body><td>%s</a>" % ID)
         class_file = "imageresultreverse-%s_frame%s.html" % (ID, frame_num)
@@ -147,20 +144,24 @@ def pp_reverse_image_search_html(verbclasslist, frame_list, scheme_list):
             else:
                 INDEX.write("%s\n" % results[i])
         VNCLASS = open("html/%s" % class_file, 'w')
-        verbclass = search_by_ID(verbclasslist, ID)
+        verbclass = index.lookup(ID)
         class_writer = HtmlClassWriter(VNCLASS, verbclass)
         class_writer.write(frames=[frame_num])
     pp_html_end(INDEX)
 
 
-def pp_reverse_image_bins_html(verbclasslist, frame_list, scheme_list):
+def pp_reverse_image_bins_html(verbclasslist, frame_list, scheme_list,
+                               engine=None):
+    if engine is None:
+        engine = ImageSearchEngine(scheme_list, verbclasslist)
+    index = IDIndex(verbclasslist)
     INDEX = open('html/image_search_bins_index.html', 'w')
     pp_html_begin(INDEX)
     image_bins = dict()
-    for frame,frame_num,ID in sorted(set(frame_list)):
+    for frame,frame_num,ID in sorted(set(frame_list), key=frame_order):
         results = set()
         for scheme in scheme_list:
-            if reverse_image_search(frame, scheme):
+            if engine.reverse_search(frame, scheme):
                 results.add(scheme.name)
         if frozenset(results) in list(image_bins.keys()):
             image_bins[frozenset(results)].append((frame, frame_num, ID))
@@ -177,7 +178,7 @@ def pp_reverse_image_bins_html(verbclasslist, frame_list, scheme_list):
             class_file = "imageresultbins-%s_frame%s.html" % (ID, frame_num)
             INDEX.write("<a href=\"%s\">%s<sup>%s&emsp;</sup></a>" % (class_file, ID, frame_num))
             VNCLASS = open("html/%s" % class_file, 'w')
-            verbclass = search_by_ID(verbclasslist, ID)
+            verbclass = index.lookup(ID)
             class_writer = HtmlClassWriter(VNCLASS, verbclass)
             class_writer.write(frames=[frame_num])
     pp_html_end(INDEX)
@@ -220,16 +221,19 @@ def test_image_searches(vn_classes):
         print(([vcid for frame, vcid in results], len(results), "\n"))
 
 
-def new_image_searches(vn_classes):
+def new_image_searches(vn_classes, engine=None):
+    if engine is None:
+        engine = ImageSearchEngine(SCHEME_LIST, vn_classes)
     results = []
     for scheme in SCHEME_LIST:
-        result = image_schema_search(vn_classes, scheme)
+        result = engine.search(scheme)
         results.append((scheme, result))
     return results
 
 
-def reverse_image_frame_list(vn_classes):
-    image_results = new_image_searches(vn_classes)
+def reverse_image_frame_list(vn_classes, image_results=None):
+    if image_results is None:
+        image_results = new_image_searches(vn_classes)
     frame_list = []
     for scheme, results in image_results:
         for vc_id, class_results in results:
@@ -239,17 +243,18 @@ def reverse_image_frame_list(vn_classes):
 
 
 def create_schema_to_verbnet_mappings(vn_classes):
-    image_results = new_image_searches(vn_classes)
-    frames = reverse_image_frame_list(vn_classes)
-    pp_image_search_html(vn_classes, image_results)
-    pp_reverse_image_search_html(vn_classes, frames, SCHEME_LIST)
-    pp_reverse_image_bins_html(vn_classes, frames, SCHEME_LIST)
+    engine = ImageSearchEngine(SCHEME_LIST, vn_classes)
+    image_results = new_image_searches(vn_classes, engine)
+    frames = reverse_image_frame_list(vn_classes, image_results)
+    pp_image_search_html(vn_classes, image_results, engine)
+    pp_reverse_image_search_html(vn_classes, frames, SCHEME_LIST, engine)
+    pp_reverse_image_bins_html(vn_classes, frames, SCHEME_LIST, engine)
 
 
 
 if __name__ == '__main__':
 
-    vn = VerbNet(max_count=50)
+    vn = VerbNet(limit=50, cache=True)
     #vn = VerbNet(file_list='list-motion-classes.txt')
     #vn = VerbNet(file_list='list-random.txt')
     #vn = VerbNet()
@@ -36,12 +36,12 @@ The VerbNet location should be specified in config.py.
 # TODO: there are some nasty hard-wired directories here
 
 
+import sys
 from collections import Counter
 
 sys.path.append('/Users/marc/Documents/git/tarsqi/ttk/components/preprocessing')
 sys.path.append('/Users/marc/Desktop/tarsqi/code/ttk/git/ttk/components/preprocessing/')
 
-from tokenizer import Tokenizer
 from treetagger import TreeTagger
 import verbnet;
 
@@ -71,6 +71,9 @@ def preprocess_sentences():
 
 
 def tokenize(sentence):
+    # the TTK tokenizer is only needed for preprocessing, importing it here
+    # allows the slurp functions to be used without TTK
+    from tokenizer import Tokenizer
     tokenizer = Tokenizer(sentence)
     tokenizer.tokenize_text()
     tokenized = tokenizer.get_tokenized_as_string()
@@ -129,7 +129,7 @@ class PredicateStatistics(object):
         
 # Get the goods
 if __name__ == '__main__':
-    vnp = VerbNetParser()
+    vnp = VerbNet(cache=True)
     vngl = [GLVerbClass(vc) for vc in vnp.classes]
     print("Total Number of classes: ", len(vngl))
     stats = PredicateStatistics(vngl)
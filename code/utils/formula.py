@@ -8,7 +8,10 @@ Simple implementation for formulas.
 class Formula(object):
 
     """Simple implementation for formulas. A formula is (1) a predicate like
-    motion(e), (2) a variable like x or x1, or (3) a negation of a predicate."""
+    motion(e), (2) a variable like x or x1, or (3) a negation of a predicate.
+    Formulas are created in large numbers so all formula classes use slots."""
+
+    __slots__ = ()
 
     def __ne__(self, other):
         return self.__eq__(other)
@@ -19,6 +22,8 @@ class Pred(Formula):
     """To implement things like motion(e) and At(x1,x2), but also more complex
     things like holds(te,At(x1,x2))."""
 
+    __slots__ = ('pred', 'formulas')
+
     def __init__(self, pred, formulas):
         self.pred = pred
         self.formulas = formulas
@@ -37,22 +42,33 @@ class Pred(Formula):
 
 
 class At(Pred):
+
+    __slots__ = ()
+
     def __init__(self, object_var, location_var):
         Pred.__init__(self, 'At', [object_var, location_var])
 
 
 class Have(Pred):
+
+    __slots__ = ()
+
     def __init__(self, owner_var, object_var, ):
         Pred.__init__(self, 'Have', [owner_var, object_var])
 
 
 class Holds(Pred):
+
+    __slots__ = ()
+
     def __init__(self, time_var, formula):
         Pred.__init__(self, 'Holds-in', [time_var, formula])
 
 
 class Not(Formula):
 
+    __slots__ = ('formula',)
+
     def __init__(self, formula):
         self.formula = formula
 
@@ -71,19 +87,11 @@ class Not(Formula):
 class Var(Formula):
 
     """Implements a variable, mostly so we can print it nicely. Variables can be
-    a string like 'Traj' or a letter with an integer like 'x1'. Also keeps track
-    of counts for variables that are not used in the subcategorisation."""
+    a string like 'Traj' or a letter with an integer like 'x1'. Names for
+    variables that are not used in the subcategorisation are handed out by a
+    VariableScope."""
 
-    variable_count = 0
-
-    @classmethod
-    def get_unbound_variable(cls):
-        Var.variable_count += 1
-        return "x%d" % Var.variable_count
-
-    @classmethod
-    def reset_unbound_variable_count(cls):
-        Var.variable_count = 0
+    __slots__ = ('ID',)
 
     def __init__(self, variable):
         self.ID = variable
@@ -101,3 +109,19 @@ class Var(Formula):
             return "<i>%s<sub>%s</sub></i>" % (self.ID[0], self.ID[1:])
         else:
             return "<i>%s</i>" % self.ID
+
+
+class VariableScope(object):
+
+    """Hands out names for unbound variables. Each scope numbers its variables
+    from x1 onwards and scopes do not share any state, so every frame can have
+    its own scope and frames can be created in any order or in parallel."""
+
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def get_unbound_variable(self):
+        self.count += 1
+        return "x%d" % self.count
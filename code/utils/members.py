@@ -0,0 +1,394 @@
+"""members.py
+
+Indexes over the members of verb classes, for going from a verb in a text to
+the classes, frames and GL structures it occurs in.
+
+The MemberIndex maps the name of each member to entries for all classes and
+subclasses that have a member with that name. Names are VerbNet member names,
+which are lower case and use underscores for multi-word verbs like take_off.
+The index also maps WordNet sense keys and PropBank rolesets, taken from the wn
+and grouping attributes of the members, to the same entries. Sense keys are
+stored without the question mark that VerbNet uses for uncertain mappings and
+can be looked up in the short form used by VerbNet, like run%2:38:00, or with
+the empty head fields of WordNet, like run%2:38:00::.
+
+>>> index = MemberIndex([])
+>>> index.lookup(['run', 'walk'])
+[(), ()]
+>>> normalize_sense_key('?run%2:38:00::')
+'run%2:38:00'
+
+For verbs that are inflected or misspelled the MemberIndex has two more
+lookups, both built from the member names. An InflectionTable maps inflected
+forms created with simple English spelling rules and a table of irregular
+verbs to their lemmas, and a TrigramIndex finds names that share many
+character trigrams with a word:
+
+>>> forms = InflectionTable(['carry', 'stop', 'take_off', 'run'])
+>>> forms.lemmas('carried'), forms.lemmas('stopping'), forms.lemmas('took_off')
+(('carry',), ('stop',), ('take_off',))
+>>> forms = InflectionTable(['see', 'seed', 'saw', 'go', 'be'])
+>>> forms.lemmas('saw'), forms.lemmas('seed'), forms.lemmas('goed'), forms.lemmas('bed')
+(('saw', 'see'), ('seed',), (), ())
+>>> TrigramIndex(['carry', 'stop', 'run']).similar('cary')
+[('carry', 0.667)]
+
+The index works for both verbnet.VerbClass and verbnetgl.GLVerbClass, it only
+needs the ID, members and subclasses attributes.
+
+"""
+
+import heapq
+import itertools
+
+
+NO_ENTRIES = ()
+
+
+class MemberEntry(object):
+
+    """An occurrence of a member in the class hierarchy. The class_ID is the
+    identifier of the top-level class, path has the identifiers of the
+    subclasses from the top-level class down to the subclass that contains the
+    member and is empty for members of a top-level class, and verbclass is the
+    class or subclass that contains the member."""
+
+    __slots__ = ('class_ID', 'path', 'member', 'verbclass')
+
+    def __init__(self, class_ID, path, member, verbclass):
+        self.class_ID = class_ID
+        self.path = path
+        self.member = member
+        self.verbclass = verbclass
+
+    def __str__(self):
+        return "<MemberEntry %s %s>" % (self.member.name,
+                                        '/'.join((self.class_ID,) + self.path))
+
+    def __repr__(self):
+        return str(self)
+
+
+class MemberIndex(object):
+
+    """Maps member names, WordNet sense keys and PropBank rolesets to tuples of
+    MemberEntries, in the order of the class list with each class followed by
+    its subclasses. There is one entry for each member, shared by the three
+    mappings. The index should be created again after classes were
+    reloaded."""
+
+    def __init__(self, verbclasslist):
+        entries = {}
+        senses = {}
+        groupings = {}
+        for vc in verbclasslist:
+            self._add_class(entries, senses, groupings, vc, vc.ID, ())
+        self.entries = _freeze(entries)
+        self.senses = _freeze(senses)
+        self.groupings = _freeze(groupings)
+        self.forms = InflectionTable(self.entries)
+        self.trigrams = TrigramIndex(self.entries)
+
+    def __str__(self):
+        return "<MemberIndex names=%s senses=%s groupings=%s>" \
+            % (len(self.entries), len(self.senses), len(self.groupings))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def _add_class(self, entries, senses, groupings, vc, class_ID, path):
+        for member in vc.members:
+            entry = MemberEntry(class_ID, path, member, vc)
+            entries.setdefault(member.name, []).append(entry)
+            for key in sense_keys(member):
+                senses.setdefault(key, []).append(entry)
+            for roleset in rolesets(member):
+                groupings.setdefault(roleset, []).append(entry)
+        for subclass in vc.subclasses:
+            self._add_class(entries, senses, groupings,
+                            subclass, class_ID, path + (subclass.ID,))
+
+    def names(self):
+        """Return the member names in the index."""
+        return list(self.entries)
+
+    def get(self, name):
+        """Return the entries for a member name, an empty tuple if there are none."""
+        return self.entries.get(name, NO_ENTRIES)
+
+    def lookup(self, names):
+        """Return a list with the tuple of entries for each name in an iterable of
+        names, the tuples are shared and should not be changed."""
+        return list(map(self.entries.get, names, itertools.repeat(NO_ENTRIES)))
+
+    def classes(self, name):
+        """Return the classes and subclasses that have a member with the name."""
+        return [entry.verbclass for entry in self.get(name)]
+
+    def get_sense(self, key):
+        """Return the entries for the members with the WordNet sense key."""
+        return self.senses.get(normalize_sense_key(key), NO_ENTRIES)
+
+    def lookup_senses(self, keys):
+        """Return a list with the tuple of entries for each sense key."""
+        return [self.get_sense(key) for key in keys]
+
+    def get_grouping(self, roleset):
+        """Return the entries for the members with the PropBank roleset, for example
+        run.01."""
+        return self.groupings.get(roleset, NO_ENTRIES)
+
+    def lookup_groupings(self, rolesets):
+        """Return a list with the tuple of entries for each roleset."""
+        return list(map(self.groupings.get, rolesets, itertools.repeat(NO_ENTRIES)))
+
+    def get_form(self, form):
+        """Return the entries for all lemmas of an inflected form, a lemma is a form
+        of itself."""
+        lemmas = self.forms.lemmas(form)
+        if len(lemmas) == 1:
+            return self.get(lemmas[0])
+        return tuple(entry for lemma in lemmas for entry in self.get(lemma))
+
+    def similar(self, word, limit=5, threshold=0.3):
+        """Return up to limit pairs of member names and their similarity to the
+        word, see TrigramIndex.similar()."""
+        return self.trigrams.similar(word, limit, threshold)
+
+    def resolve(self, word):
+        """Return the entries for a word, trying the word as a lemma, then as an
+        inflected form and then taking the most similar name."""
+        entries = self.get_form(word)
+        if not entries:
+            candidates = self.trigrams.similar(word, 1)
+            if candidates:
+                entries = self.get(candidates[0][0])
+        return entries
+
+    def is_uncertain(self, entry, key):
+        """Return True if VerbNet marks the mapping from the member of the entry to
+        the sense key as uncertain."""
+        key = normalize_sense_key(key)
+        return '?' + key in (entry.member.wn or '').split()
+
+
+def sense_keys(member):
+    """Return the normalized WordNet sense keys of a member, without duplicates."""
+    keys = [normalize_sense_key(key) for key in (member.wn or '').split()]
+    return list(dict.fromkeys(keys))
+
+
+def rolesets(member):
+    """Return the PropBank rolesets of a member, without duplicates."""
+    return list(dict.fromkeys((member.grouping or '').split()))
+
+
+def normalize_sense_key(key):
+    """Return the sense key without the question mark for uncertain mappings and
+    without the trailing colons of the empty head fields."""
+    return key.lstrip('?').rstrip(':')
+
+
+class InflectionTable(object):
+
+    """Maps inflected forms of verbs to their lemmas. Third person singular, past
+    tense, past participle and present participle forms are created with
+    regular spelling rules, for verbs that end in a consonant and a vowel and
+    a consonant forms with and without a doubled consonant are both added.
+    Irregular forms are taken from IRREGULAR_VERBS and IRREGULAR_PRESENT and
+    replace the forms the rules would make. For multi-word verbs only the
+    first word is inflected. A form can have more than one lemma, for example
+    saw is a lemma and a form of see. The lemmas of a form are ordered with
+    the form itself first, then the lemmas it is an irregular form of and
+    then the lemmas the rules made it from. The rules also make forms that
+    are not words, like visitted, so a form made by the rules is not added
+    if it is a lemma itself."""
+
+    def __init__(self, lemmas):
+        lemmas = list(lemmas)
+        known = set(lemmas)
+        ranked = {}
+        for lemma in lemmas:
+            irregular, regular = inflections(lemma)
+            ranked.setdefault(lemma, []).append((0, lemma))
+            for form in irregular:
+                ranked.setdefault(form, []).append((1, lemma))
+            for form in regular:
+                if form not in known:
+                    ranked.setdefault(form, []).append((2, lemma))
+        forms = {}
+        for form, pairs in ranked.items():
+            pairs.sort(key=lambda pair: pair[0])
+            forms[form] = list(dict.fromkeys([lemma for rank, lemma in pairs]))
+        self.forms = _freeze(forms)
+
+    def __len__(self):
+        return len(self.forms)
+
+    def lemmas(self, form):
+        """Return the tuple of lemmas of the form."""
+        return self.forms.get(form.lower(), NO_ENTRIES)
+
+
+def inflections(lemma):
+    """Return the irregular forms of the lemma and the forms made with the
+    spelling rules, as two lists. The rules do not make the past forms of
+    verbs in IRREGULAR_FORMS and the present forms of verbs in
+    IRREGULAR_PRESENT."""
+    first, separator, rest = lemma.partition('_')
+    present = IRREGULAR_PRESENT.get(first)
+    past = IRREGULAR_FORMS.get(first)
+    if first.endswith(('s', 'x', 'z', 'ch', 'sh', 'o')):
+        regular_present = [first + 'es']
+    elif _consonant_y(first):
+        regular_present = [first[:-1] + 'ies']
+    else:
+        regular_present = [first + 's']
+    if _consonant_y(first):
+        regular_past, regular_ing = [first[:-1] + 'ied'], [first + 'ing']
+    elif first.endswith('ie'):
+        regular_past, regular_ing = [first + 'd'], [first[:-2] + 'ying']
+    elif first.endswith(('ee', 'ye', 'oe')):
+        regular_past, regular_ing = [first + 'd'], [first + 'ing']
+    elif first.endswith('e'):
+        regular_past, regular_ing = [first + 'd'], [first[:-1] + 'ing']
+    else:
+        stems = [first]
+        if _short_syllable(first):
+            stems.append(first + first[-1])
+        regular_past = [stem + 'ed' for stem in stems]
+        regular_ing = [stem + 'ing' for stem in stems]
+    regular = []
+    if present is None:
+        regular.extend(regular_present + regular_ing)
+    if past is None:
+        regular.extend(regular_past)
+    irregular = list(present or ()) + list(past or ())
+    return ([form + separator + rest for form in irregular],
+            [form + separator + rest for form in regular])
+
+
+def _consonant_y(word):
+    return len(word) > 1 and word[-1] == 'y' and word[-2] not in VOWELS
+
+
+def _short_syllable(word):
+    # a word ending in consonant, vowel, consonant, like stop or admit
+    return len(word) > 2 and word[-1] not in VOWELS + 'wxy' \
+        and word[-2] in VOWELS and word[-3] not in VOWELS
+
+
+VOWELS = 'aeiou'
+
+# Base form, past tense and past participle of common irregular verbs, with
+# alternative forms separated by a slash.
+IRREGULAR_VERBS = """
+arise arose arisen, awake awoke awoken, bear bore borne/born, beat beat beaten,
+be was/were been, become became become, begin began begun, bend bent bent, bet bet bet,
+bind bound bound, bite bit bitten, bleed bled bled, blow blew blown,
+break broke broken, breed bred bred, bring brought brought,
+build built built, burn burnt burnt, burst burst burst, buy bought bought,
+cast cast cast, catch caught caught, choose chose chosen, cling clung clung,
+come came come, cost cost cost, creep crept crept, cut cut cut,
+deal dealt dealt, dig dug dug, dive dove dived, do did done, draw drew drawn,
+dream dreamt dreamt, drink drank drunk, drive drove driven, eat ate eaten,
+fall fell fallen, feed fed fed, feel felt felt, fight fought fought,
+find found found, flee fled fled, fling flung flung, fly flew flown,
+forbid forbade forbidden, forget forgot forgotten, forgive forgave forgiven,
+freeze froze frozen, get got gotten/got, give gave given, go went gone,
+grind ground ground, grow grew grown, hang hung hung, have had had,
+hear heard heard, hide hid hidden, hit hit hit, hold held held,
+hurt hurt hurt, keep kept kept, kneel knelt knelt, know knew known,
+lay laid laid, lead led led, lean leant leant, leap leapt leapt,
+learn learnt learnt, leave left left, lend lent lent, let let let,
+lie lay lain, light lit lit, lose lost lost, make made made, mean meant meant,
+meet met met, pay paid paid, put put put, quit quit quit, read read read,
+ride rode ridden, ring rang rung, rise rose risen, run ran run, say said said,
+see saw seen, seek sought sought, sell sold sold, send sent sent, set set set,
+sew sewed sewn, shake shook shaken, shed shed shed, shine shone shone,
+shoot shot shot, show showed shown, shrink shrank shrunk, shut shut shut,
+sing sang sung, sink sank sunk, sit sat sat, slay slew slain, sleep slept slept,
+slide slid slid, sling slung slung, slit slit slit, smell smelt smelt,
+speak spoke spoken, speed sped sped, spend spent spent, spill spilt spilt,
+spin spun spun, spit spat spat, split split split, spoil spoilt spoilt,
+spread spread spread, spring sprang sprung, stand stood stood,
+steal stole stolen, stick stuck stuck, sting stung stung, stink stank stunk,
+stride strode stridden, strike struck struck, string strung strung,
+strive strove striven, swear swore sworn, sweep swept swept,
+swell swelled swollen, swim swam swum, swing swung swung, take took taken,
+teach taught taught, tear tore torn, tell told told, think thought thought,
+throw threw thrown, thrust thrust thrust, tread trod trodden,
+understand understood understood, wake woke woken, wear wore worn,
+weave wove woven, weep wept wept, win won won, wind wound wound,
+wring wrung wrung, write wrote written
+"""
+
+IRREGULAR_FORMS = {}
+for _verb in IRREGULAR_VERBS.split(','):
+    _base, _past, _participle = _verb.split()
+    IRREGULAR_FORMS[_base] = tuple(dict.fromkeys(
+        _past.split('/') + _participle.split('/')))
+
+# Third person singular and present participle of the verbs whose present
+# forms do not follow the spelling rules, with the other present forms of be.
+IRREGULAR_PRESENT = {
+    'be': ('am', 'is', 'are', 'being'),
+    'have': ('has', 'having'),
+}
+
+
+class TrigramIndex(object):
+
+    """Index from character trigrams to names, for finding names that are similar
+    to a word. Names are padded with a space on both sides so that trigrams at
+    the start and end of a word are also used. Similarity is the Dice
+    coefficient of the sets of trigrams of the word and the name. Only names
+    that share at least one trigram with the word are looked at, and of those
+    only the max_candidates names with the most shared trigrams are scored."""
+
+    def __init__(self, names, max_candidates=50):
+        self.names = list(names)
+        self.sizes = []
+        self.postings = {}
+        self.max_candidates = max_candidates
+        for number, name in enumerate(self.names):
+            grams = trigrams(name)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(number)
+
+    def __len__(self):
+        return len(self.names)
+
+    def similar(self, word, limit=5, threshold=0.3):
+        """Return up to limit pairs of names and their similarity to the word, with
+        the most similar names first. Names with a similarity below the
+        threshold are not returned."""
+        grams = trigrams(word.lower())
+        counts = {}
+        for gram in grams:
+            for number in self.postings.get(gram, ()):
+                counts[number] = counts.get(number, 0) + 1
+        candidates = heapq.nlargest(self.max_candidates, counts.items(),
+                                    key=lambda item: item[1])
+        scored = []
+        for number, count in candidates:
+            score = 2.0 * count / (len(grams) + self.sizes[number])
+            if score >= threshold:
+                scored.append((self.names[number], round(score, 3)))
+        scored.sort(key=lambda pair: (-pair[1], pair[0]))
+        return scored[:limit]
+
+
+def trigrams(word):
+    """Return the set of character trigrams of the padded word."""
+    word = ' %s ' % word
+    return set([word[i:i+3] for i in range(len(word) - 2)])
+
+
+def _freeze(table):
+    # tuples take less space than lists and can be handed out without copying
+    return {key: tuple(value) for key, value in table.items()}
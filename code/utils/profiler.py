@@ -0,0 +1,112 @@
+"""profiler.py
+
+Lightweight instrumentation with named timers and counters. There is one
+profiler for the whole program, it is disabled by default and then timers and
+counters cost next to nothing. Usage:
+
+>>> from utils.profiler import PROFILER
+>>> PROFILER.enable()
+>>> with PROFILER.timer('parse'):
+...     PROFILER.count('files_parsed')
+>>> PROFILER.report()['counters']
+{'files_parsed': 1}
+
+Timers accumulate the seconds spent in them and the number of times they were
+entered, timers can be nested. The report can be written as JSON.
+
+Work done by a pool of processes is counted in those processes. Use the
+starmap() method instead of the starmap() method of the pool to add their
+timers and counters to the profiler of the main process. Timers of the
+workers add up the time spent in all workers, so they can be larger than the
+time that passed.
+
+"""
+
+import json
+import time
+import contextlib
+
+
+class Profiler(object):
+
+    def __init__(self):
+        self.enabled = False
+        self.timers = {}
+        self.counters = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def timer(self, name):
+        """Return a context manager that adds the time spent in it to the timer with
+        the given name."""
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name)
+
+    def count(self, name, n=1):
+        """Add n to the counter with the given name."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self):
+        """Return a dictionary with all timers and counters."""
+        timers = {name: {'seconds': round(seconds, 6), 'calls': calls}
+                  for name, (seconds, calls) in self.timers.items()}
+        return {'timers': timers, 'counters': dict(self.counters)}
+
+    def merge(self, report):
+        """Add the timers and counters of a report to this profiler."""
+        for name, timer in report['timers'].items():
+            total, calls = self.timers.get(name, (0.0, 0))
+            self.timers[name] = (total + timer['seconds'], calls + timer['calls'])
+        for name, n in report['counters'].items():
+            self.count(name, n)
+
+    def starmap(self, pool, function, arguments, chunksize=1):
+        """Return pool.starmap(function, arguments, chunksize). If the profiler is
+        enabled the workers profile each call and their reports are merged into
+        this profiler."""
+        if not self.enabled:
+            return pool.starmap(function, arguments, chunksize)
+        pairs = pool.starmap(_profiled_call,
+                             [(function, args) for args in arguments], chunksize)
+        for result, report in pairs:
+            self.merge(report)
+        return [result for result, report in pairs]
+
+    def write(self, fname):
+        """Write the report as JSON to a file."""
+        with open(fname, 'w') as fh:
+            json.dump(self.report(), fh, indent=2, sort_keys=True)
+            fh.write("\n")
+
+
+class Timer(object):
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start
+        timers = self.profiler.timers
+        total, calls = timers.get(self.name, (0.0, 0))
+        timers[self.name] = (total + seconds, calls + 1)
+
+
+def _profiled_call(function, args):
+    # runs in a worker process, with a profiler that only has this call
+    PROFILER.enable()
+    PROFILER.timers = {}
+    PROFILER.counters = {}
+    result = function(*args)
+    return result, PROFILER.report()
+
+
+NULL_TIMER = contextlib.nullcontext()
+
+PROFILER = Profiler()
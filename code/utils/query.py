@@ -0,0 +1,346 @@
+"""query.py
+
+Composable queries over the frames of GLVerbClasses. A query is built from
+terms that select frames and is combined with & (and), | (or) and ~ (not):
+
+    query = Pred('motion') & Role('Destination') & Prep('to')
+
+The same query can be written as a string and parsed:
+
+    query = parse('pred:motion & role:Destination & prep:to')
+
+Queries are run against a SearchIndex, each term is a posting list of frame
+numbers in the index and the operators become intersections, unions and
+differences of those lists. The planner evaluates the terms of a conjunction
+from the most selective to the least selective one, stops as soon as the
+result is empty, and subtracts negated terms instead of computing their
+complements. The results are (frame, ID) pairs like those of the search
+functions, in the order of the frames in the index:
+
+    index = SearchIndex(classes)
+    for frame, ID in query.search(index):
+        ...
+    print(query.explain(index))
+
+The terms are:
+
+    Pred(value)         frames with a predicate, like motion
+    Arg(value)          frames with a predicate argument, like ch_of_poss
+    Role(role)          frames of classes with the thematic role
+    POS(cat)            frames with the syntactic category in the subcat
+    CatRole(cat, role)  frames with the category and role pair in the subcat
+    Prep(preposition)   frames with a PREP element that allows the preposition
+
+In the string syntax the terms are written as pred:motion, arg:ch_of_poss,
+role:Agent, pos:NP, catrole:NP/Agent and prep:to. Negation is written with !
+and parentheses can be used for grouping, & binds stronger than |.
+
+"""
+
+import re
+
+from .search import SearchIndex, intersect
+
+
+class Query(object):
+
+    """Abstract class for queries. Subclasses implement estimate(), which returns
+    an estimate of the number of frames selected that is used by the planner,
+    evaluate(), which returns the sorted list of frame numbers, and __str__()."""
+
+    def __and__(self, other):
+        return And([self, other])
+
+    def __or__(self, other):
+        return Or([self, other])
+
+    def __invert__(self):
+        return Not(self)
+
+    def __repr__(self):
+        return "<%s %s>" % (self.__class__.__name__, self)
+
+    def search(self, index):
+        """Returns the (frame, ID) pairs of the frames that match the query. The index
+        is a SearchIndex or a list of classes to create one from."""
+        index = _as_index(index)
+        return [index.frames[n] for n in self.evaluate(index)]
+
+    def explain(self, index):
+        """Returns the plan as a string, with the terms in the order in which they are
+        evaluated, each with the number of frames it selected."""
+        index = _as_index(index)
+        trace = []
+        self.evaluate(index, trace)
+        lines = ["%-50s %6s" % ('plan', 'frames')]
+        for depth, description, count in trace:
+            lines.append("%-50s %6s" % ('  ' * depth + description, count))
+        return "\n".join(lines)
+
+
+class Term(Query):
+
+    """A query that looks up a posting list in the index."""
+
+    name = None
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return "%s:%s" % (self.name, self.value)
+
+    def postings(self, index):
+        raise NotImplementedError()
+
+    def estimate(self, index):
+        return len(self.postings(index))
+
+    def evaluate(self, index, trace=None, depth=0):
+        result = self.postings(index)
+        _finish(_start(trace, depth, str(self)), result)
+        return result
+
+
+class Pred(Term):
+
+    name = 'pred'
+
+    def postings(self, index):
+        return index.predicate_postings.get(self.value, [])
+
+
+class Arg(Term):
+
+    name = 'arg'
+
+    def postings(self, index):
+        return index.argument_postings.get(self.value, [])
+
+
+class Role(Term):
+
+    name = 'role'
+
+    def postings(self, index):
+        return index.role_postings.get(self.value, [])
+
+
+class POS(Term):
+
+    name = 'pos'
+
+    def postings(self, index):
+        return index.category_postings.get(self.value, [])
+
+
+class Prep(Term):
+
+    name = 'prep'
+
+    def postings(self, index):
+        return index.preposition_postings.get(self.value, [])
+
+
+class CatRole(Term):
+
+    name = 'catrole'
+
+    def __init__(self, cat, role):
+        self.value = (cat, role)
+
+    def __str__(self):
+        return "%s:%s/%s" % (self.name, self.value[0], self.value[1])
+
+    def postings(self, index):
+        return index.pair_postings.get(self.value, [])
+
+
+class And(Query):
+
+    def __init__(self, queries):
+        self.queries = []
+        for query in queries:
+            self.queries.extend(query.queries if isinstance(query, And) else [query])
+
+    def __str__(self):
+        return "(%s)" % ' & '.join([str(q) for q in self.queries])
+
+    def estimate(self, index):
+        positive = [q for q in self.queries if not isinstance(q, Not)]
+        if not positive:
+            return len(index.frames)
+        return min([q.estimate(index) for q in positive])
+
+    def plan(self, index):
+        """Returns the positive and the negated queries, both ordered from most to
+        least selective."""
+        positive = [q for q in self.queries if not isinstance(q, Not)]
+        negated = [q.query for q in self.queries if isinstance(q, Not)]
+        positive.sort(key=lambda q: q.estimate(index))
+        negated.sort(key=lambda q: -q.estimate(index))
+        return positive, negated
+
+    def evaluate(self, index, trace=None, depth=0):
+        entry = _start(trace, depth, 'and')
+        positive, negated = self.plan(index)
+        if positive:
+            result = positive[0].evaluate(index, trace, depth + 1)
+            for query in positive[1:]:
+                if not result:
+                    break
+                result = intersect([result, query.evaluate(index, trace, depth + 1)],
+                                   len(index.frames))
+        else:
+            result = list(range(len(index.frames)))
+        for query in negated:
+            if not result:
+                break
+            not_entry = _start(trace, depth + 1, 'and not')
+            excluded = set(query.evaluate(index, trace, depth + 2))
+            result = [n for n in result if n not in excluded]
+            _finish(not_entry, result)
+        _finish(entry, result)
+        return result
+
+
+class Or(Query):
+
+    def __init__(self, queries):
+        self.queries = []
+        for query in queries:
+            self.queries.extend(query.queries if isinstance(query, Or) else [query])
+
+    def __str__(self):
+        return "(%s)" % ' | '.join([str(q) for q in self.queries])
+
+    def estimate(self, index):
+        return min(len(index.frames), sum([q.estimate(index) for q in self.queries]))
+
+    def evaluate(self, index, trace=None, depth=0):
+        entry = _start(trace, depth, 'or')
+        result = set()
+        for query in self.queries:
+            result.update(query.evaluate(index, trace, depth + 1))
+        result = sorted(result)
+        _finish(entry, result)
+        return result
+
+
+class Not(Query):
+
+    def __init__(self, query):
+        self.query = query
+
+    def __str__(self):
+        return "!%s" % self.query
+
+    def estimate(self, index):
+        return len(index.frames) - self.query.estimate(index)
+
+    def evaluate(self, index, trace=None, depth=0):
+        entry = _start(trace, depth, 'not')
+        excluded = set(self.query.evaluate(index, trace, depth + 1))
+        result = [n for n in range(len(index.frames)) if n not in excluded]
+        _finish(entry, result)
+        return result
+
+
+def _as_index(index):
+    return index if isinstance(index, SearchIndex) else SearchIndex(index)
+
+
+def _start(trace, depth, description):
+    # add a line to the trace used by explain(), the number of frames is filled
+    # in by _finish() when the query was evaluated
+    if trace is None:
+        return None
+    entry = [depth, description, None]
+    trace.append(entry)
+    return entry
+
+
+def _finish(entry, result):
+    if entry is not None:
+        entry[2] = len(result)
+
+
+TERMS = { 'pred': Pred, 'arg': Arg, 'role': Role, 'pos': POS, 'prep': Prep }
+
+TOKENS = re.compile(r'\s*(?:([&|!()])|([a-z]+):([^\s&|!()]+))')
+
+
+def parse(string):
+    """Parse a query string into a Query. Raises a ValueError for syntax errors.
+
+    >>> print(parse('pred:motion & !(prep:to | prep:into)'))
+    (pred:motion & !(prep:to | prep:into))
+    >>> parse('pred:motion role:Agent')
+    Traceback (most recent call last):
+    ...
+    ValueError: unexpected role:Agent in query: pred:motion role:Agent
+
+    """
+    tokens = []
+    position = 0
+    string = string.rstrip()
+    while position < len(string):
+        match = TOKENS.match(string, position)
+        if match is None:
+            raise ValueError("syntax error at position %d: %s" % (position, string))
+        tokens.append(match.groups())
+        position = match.end()
+    tokens.append((None, None, None))
+    query, position = _parse_or(tokens, 0)
+    if tokens[position][0] is not None or tokens[position][1] is not None:
+        raise ValueError("unexpected %s in query: %s"
+                         % (_token_text(tokens[position]), string))
+    return query
+
+
+def _parse_or(tokens, position):
+    queries = []
+    query, position = _parse_and(tokens, position)
+    queries.append(query)
+    while tokens[position][0] == '|':
+        query, position = _parse_and(tokens, position + 1)
+        queries.append(query)
+    return (queries[0] if len(queries) == 1 else Or(queries)), position
+
+
+def _parse_and(tokens, position):
+    queries = []
+    query, position = _parse_not(tokens, position)
+    queries.append(query)
+    while tokens[position][0] == '&':
+        query, position = _parse_not(tokens, position + 1)
+        queries.append(query)
+    return (queries[0] if len(queries) == 1 else And(queries)), position
+
+
+def _parse_not(tokens, position):
+    operator, key, value = tokens[position]
+    if operator == '!':
+        query, position = _parse_not(tokens, position + 1)
+        return Not(query), position
+    if operator == '(':
+        query, position = _parse_or(tokens, position + 1)
+        if tokens[position][0] != ')':
+            raise ValueError("missing closing parenthesis")
+        return query, position + 1
+    if key == 'catrole':
+        if '/' not in value:
+            raise ValueError("catrole needs a category and a role: %s" % value)
+        return CatRole(*value.split('/', 1)), position + 1
+    if key in TERMS:
+        return TERMS[key](value), position + 1
+    if key is not None:
+        raise ValueError("unknown term: %s" % key)
+    raise ValueError("unexpected %s in query" % _token_text(tokens[position]))
+
+
+def _token_text(token):
+    operator, key, value = token
+    if key is not None:
+        return "%s:%s" % (key, value)
+    return operator or 'end'
@@ -4,51 +4,399 @@ Module with search functions for Verbnet classes.
 
 May at some point do some niftier search than it does now.
 
+Predicate names, argument values, roles and categories on the classes are
+interned symbols (see symbols.py), so search terms are looked up in the symbol
+tables first and then compared by identity or identifier.
+
+The functions below scan the classes they are handed. For many queries over
+the same classes it is better to build a SearchIndex or an IDIndex once and use
+their methods, which take time proportional to the size of the result.
+
+Results of the search functions are kept in SEARCH_CACHE, a bounded cache that
+drops the least recently used results first. Results are cached for the
+classes in the searched list, so changing the list gives a new key. The cache
+is cleared when VerbnetGL is reloaded, use its info() method to get the
+numbers of hits and misses and set its maxsize to 0 to switch it off. Lists
+and sets returned by the search functions are copies of the cached ones.
+
 """
 
+import bisect
+import heapq
+import inspect
+import functools
+import collections
+
+from .symbols import ROLE_TYPES, CATEGORIES, PREDICATES, ARGUMENTS
+from .subcats import restricted_prepositions
+
+
+
+def iter_classes(verbclasslist):
+    """Generate all classes and subclasses, each class is directly followed by its
+    subclasses."""
+    for vc in verbclasslist:
+        yield vc
+        for subclass in iter_classes(vc.subclasses):
+            yield subclass
+
+
+class SearchCache(object):
+
+    """Bounded cache for the results of search functions, with the least recently
+    used results dropped first. Keys are the name of the function, the identity
+    of the searched list of classes and the other arguments, where arguments
+    are normalized into hashable values. The classes are part of the key by
+    identity, entries keep a reference to them so their identities are not
+    reused by other classes."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
 
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return "<SearchCache size=%s maxsize=%s hits=%s misses=%s>" \
+            % (len(self), self.maxsize, self.hits, self.misses)
+
+    def info(self):
+        """Return a dictionary with the numbers of hits and misses and the size."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self), 'maxsize': self.maxsize}
+
+    def clear(self):
+        """Remove all results and reset the numbers of hits and misses."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def call(self, function, values):
+        """Return the result of the function for the values of all its arguments,
+        in the order of its signature. The first argument is the list of classes
+        that is searched."""
+        if self.maxsize <= 0:
+            return function(*values)
+        classes = tuple(values[0])
+        key = (function.__name__, tuple(map(id, classes))) + _hashable(values[1:])
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            result = entry[1]
+        else:
+            self.misses += 1
+            result = function(*values)
+            self.entries[key] = (classes, result)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return _copy(result)
+
+
+def _copy(value):
+    """Return a copy of a result where lists, tuples and sets are copied, so the
+    caller can change it without changing the cached result."""
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple([_copy(v) for v in value])
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _hashable(value):
+    """Return a hashable version of a value, lists become tuples, sets become frozen
+    sets and objects like image schemes become tuples with their class name and
+    their attributes."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple([_hashable(v) for v in value])
+    if isinstance(value, (set, frozenset)):
+        return frozenset([_hashable(v) for v in value])
+    if isinstance(value, dict):
+        return tuple(sorted([(k, _hashable(v)) for k, v in value.items()]))
+    if hasattr(value, '__dict__'):
+        return (value.__class__.__name__, _hashable(vars(value)))
+    return value
+
+
+def cached(function):
+    """Decorator for search functions that makes them use SEARCH_CACHE. Keyword
+    and default arguments are put in the order of the signature of the
+    function so that they give the same key as positional arguments. The
+    uncached function is available as the __wrapped__ attribute."""
+    parameters = list(inspect.signature(function).parameters.values())
+    @functools.wraps(function)
+    def cached_function(*args, **kwargs):
+        values = list(args)
+        remaining = dict(kwargs)
+        for parameter in parameters[len(args):]:
+            if parameter.name in remaining:
+                values.append(remaining.pop(parameter.name))
+            elif parameter.default is not parameter.empty:
+                values.append(parameter.default)
+            else:
+                break
+        if remaining or len(values) != len(parameters):
+            # let the function complain about the arguments
+            return function(*args, **kwargs)
+        return SEARCH_CACHE.call(function, values)
+    return cached_function
+
+
+SEARCH_CACHE = SearchCache()
+
+
+
+@cached
 def search_by_predicate(verbclasslist, pred_type):
     """Returns verbclasses that exactly match the predicate."""
-    results = []
-    for vc in verbclasslist:
-        for frame in vc.frames:
-            for pred in frame.vnframe.predicates:
-                if pred.value == pred_type and vc not in results:
-                    results.append(vc)
-    return results
+    pred_type = PREDICATES.get(pred_type)
+    if pred_type is None:
+        return []
+    return [vc for vc in verbclasslist
+            if any(pred_type in frame.vnframe.predicate_index
+                   for frame in vc.frames)]
 
 
+@cached
 def search_by_argtype(verbclasslist, argtype):
     """Returns verbclasses that have predicates that contain the sought after
     argtype. The argtype is the value of the argtype, for example, in the
     argument ('ThemRole', '?Theme') the value is '?Theme'."""
-    results = []
-    for vc in verbclasslist:
+    argtype = ARGUMENTS.get(argtype)
+    if argtype is None:
+        return []
+    return [vc for vc in verbclasslist
+            if any(argtype in frame.vnframe.argument_index
+                   for frame in vc.frames)]
+
+
+class SearchIndex(object):
+
+    """Inverted index over a list of GLVerbClasses and all their subclasses. The
+    index maps predicate values and argument values to posting lists of the
+    classes and the frames they occur in. Classes are listed in the order of
+    the class list, with each class directly followed by its subclasses, and
+    each class is listed once. Frames are listed in the same order.
+
+    Frames are also numbered in the same order and the index maps predicate
+    values, argument values, thematic roles of the class, category and role
+    pairs from the subcat signatures, prepositions, single categories and sets
+    of categories to sorted lists of frame numbers. The prepositions of a PREP
+    element without a value are those of the preposition types in its
+    selectional restrictions, see restricted_prepositions() in subcats.py.
+    Searches intersect or merge those lists, see also query.py.
+
+    The index does not notice changes to the classes, it should be created again
+    after classes were reloaded."""
+
+    def __init__(self, verbclasslist):
+        self.classes = []
+        self.predicate_classes = {}
+        self.predicate_frames = {}
+        self.argument_classes = {}
+        self.argument_frames = {}
+        self.frames = []
+        self.predicate_postings = {}
+        self.argument_postings = {}
+        self.role_postings = {}
+        self.pair_postings = {}
+        self.preposition_postings = {}
+        self.category_postings = {}
+        self.category_set_postings = {}
+        for vc in iter_classes(verbclasslist):
+            self._add_class(vc)
+
+    def __str__(self):
+        return "<SearchIndex classes=%s frames=%s predicates=%s arguments=%s>" \
+            % (len(self.classes), len(self.frames), len(self.predicate_classes),
+               len(self.argument_classes))
+
+    def _add_class(self, vc):
+        self.classes.append(vc)
+        predicates = set()
+        arguments = set()
         for frame in vc.frames:
-            for pred in frame.vnframe.predicates:
-                for a_type, a_value in pred.args:
-                    if argtype == a_value and vc not in results:
-                        results.append(vc)
-    return results
+            self._add_frame(frame, vc)
+            for pred_value in frame.vnframe.predicate_index:
+                self.predicate_frames.setdefault(pred_value, []).append(frame)
+                predicates.add(pred_value)
+            for argvalue in frame.vnframe.argument_index:
+                self.argument_frames.setdefault(argvalue, []).append(frame)
+                arguments.add(argvalue)
+        for pred_value in predicates:
+            self.predicate_classes.setdefault(pred_value, []).append(vc)
+        for argvalue in arguments:
+            self.argument_classes.setdefault(argvalue, []).append(vc)
 
+    def _add_frame(self, frame, vc):
+        number = len(self.frames)
+        self.frames.append((frame, vc.ID))
+        for pred_value in frame.vnframe.predicate_index:
+            self.predicate_postings.setdefault(pred_value, []).append(number)
+        for argvalue in frame.vnframe.argument_index:
+            self.argument_postings.setdefault(argvalue, []).append(number)
+        for role_type in set([role.role_type for role in vc.roles]):
+            self.role_postings.setdefault(role_type, []).append(number)
+        prepositions = set()
+        for pair in frame.subcat.multiset:
+            self.pair_postings.setdefault(pair, []).append(number)
+            if pair[0] == 'PREP' and pair[1] != 'None':
+                prepositions.update(pair[1].split())
+        for element in frame.subcat.members:
+            if element.cat == 'PREP' and not element.role:
+                prepositions.update(restricted_prepositions(element.restrictions) or ())
+        for preposition in prepositions:
+            self.preposition_postings.setdefault(preposition, []).append(number)
+        categories = frozenset([cat for cat, role in frame.subcat.multiset])
+        for cat in categories:
+            self.category_postings.setdefault(cat, []).append(number)
+        self.category_set_postings.setdefault(categories, []).append(number)
 
-def search_by_ID(verbclasslist, ID, contains=False):
-    """Returns verbclasses with a given ID name.
-    Optional variable to allow for searching to see if the argtype contains a
-    string. Returns a list in case multiple classes have that ID/string"""
-    for vc in verbclasslist:
-        if not contains:
-            if ID == vc.ID:
-                return vc
-            else:
-                if len(vc.subclasses) > 0:
-                    for subclass in vc.subclasses:
-                        result = search_by_subclass_ID(subclass, ID)
-                        if result is not None:
-                            return result
+    def search_by_predicate(self, pred_type):
+        """Returns the classes and subclasses that have a frame with the
+        predicate."""
+        return list(self.predicate_classes.get(pred_type, []))
+
+    def search_by_argtype(self, argtype):
+        """Returns the classes and subclasses that have a frame with a predicate
+        argument whose value is argtype, see search_by_argtype()."""
+        return list(self.argument_classes.get(argtype, []))
+
+    def frames_by_predicate(self, pred_type):
+        """Returns the frames that have the predicate."""
+        return list(self.predicate_frames.get(pred_type, []))
+
+    def frames_by_argtype(self, argtype):
+        """Returns the frames that have a predicate argument whose value is
+        argtype."""
+        return list(self.argument_frames.get(argtype, []))
+
+    def frames_by_POS(self, POS_list):
+        """Returns frames (and their verbclass's ID) that contain all of the
+        syntactic categories in the list."""
+        postings = [self.category_postings.get(CATEGORIES.get(POS), [])
+                    for POS in POS_list]
+        return [self.frames[n] for n in intersect(postings, len(self.frames))]
+
+    def search_by_POS(self, POS_list, all_and_only=False):
+        """Returns frames (and their verbclass's ID) whose categories are all in
+        the list, with the same options as search_by_POS(). Merges the posting
+        lists of the category sets of the frames that pass."""
+        nocase_pos = [POS.lower() for POS in POS_list]
+        cats = set([cat for cat in CATEGORIES if cat.lower() in nocase_pos])
+        postings = [numbers for categories, numbers
+                    in self.category_set_postings.items() if categories <= cats]
+        results = [self.frames[n] for n in heapq.merge(*postings)]
+        if all_and_only:
+            results = [(frame, ID) for frame, ID in results
+                       if len(POS_list) == len(frame.subcat)]
+        return results
+
+    def search_by_cat_and_role(self, cat_role_pairs, all_and_only=False):
+        """Returns frames (and their verbclass's ID) that contain all of the
+        category and role pairs, with the same options as search_by_cat_and_role().
+        Intersects the posting lists of the pairs."""
+        postings = [self.pair_postings.get((cat, role), [])
+                    for cat, role in cat_role_pairs]
+        results = [self.frames[n] for n in intersect(postings, len(self.frames))]
+        if all_and_only:
+            results = [(frame, ID) for frame, ID in results
+                       if len(cat_role_pairs) == len(frame.subcat)]
+        return results
+
+
+def intersect(postings, size):
+    """Return the intersection of sorted lists of integers in a sorted list. The
+    elements of the shortest list are looked up in the other lists with a
+    binary search. An empty list of postings gives all integers from 0 up to
+    size."""
+    if not postings:
+        return list(range(size))
+    postings = sorted(postings, key=len)
+    result = []
+    for n in postings[0]:
+        for other in postings[1:]:
+            i = bisect.bisect_left(other, n)
+            if i == len(other) or other[i] != n:
+                break
         else:
-            if ID in vc.ID:
-                return vc
+            result.append(n)
+    return result
+
+
+class IDIndex(object):
+
+    """Index over the identifiers of a list of classes and all their subclasses,
+    with exact lookup in a dictionary and prefix and substring lookup in sorted
+    lists. For substring lookup all suffixes of all identifiers are kept in a
+    sorted list, a substring of an identifier is the prefix of one of its
+    suffixes. Lookups that return lists return the classes in the order of the
+    class list with each class followed by its subclasses."""
+
+    def __init__(self, verbclasslist):
+        self.classes = list(iter_classes(verbclasslist))
+        self.positions = {}
+        self.ids = {}
+        for position, vc in enumerate(self.classes):
+            self.positions.setdefault(id(vc), position)
+            self.ids.setdefault(vc.ID, vc)
+        self.sorted_ids = sorted(self.ids)
+        suffixes = sorted((ID[i:], ID) for ID in self.ids for i in range(len(ID)))
+        self.suffixes = [suffix for suffix, ID in suffixes]
+        self.suffix_ids = [ID for suffix, ID in suffixes]
+
+    def __str__(self):
+        return "<IDIndex classes=%s>" % len(self.classes)
+
+    def __contains__(self, ID):
+        return ID in self.ids
+
+    def lookup(self, ID):
+        """Return the class with the identifier, or None if there is no such class.
+        If two classes have the same identifier the first one is returned."""
+        return self.ids.get(ID)
+
+    def prefix(self, prefix):
+        """Return the classes whose identifier starts with prefix, for example
+        'run-51' returns all classes numbered 51 and their subclasses."""
+        start, end = _prefix_range(self.sorted_ids, prefix)
+        return self._classes(self.sorted_ids[start:end])
+
+    def contains(self, substring):
+        """Return the classes whose identifier contains the substring."""
+        start, end = _prefix_range(self.suffixes, substring)
+        return self._classes(self.suffix_ids[start:end])
+
+    def _classes(self, ids):
+        classes = set([self.ids[ID] for ID in ids])
+        return sorted(classes, key=lambda vc: self.positions[id(vc)])
+
+
+def _prefix_range(sorted_strings, prefix):
+    """Return the start and end of the range of strings in a sorted list that
+    start with the prefix."""
+    start = bisect.bisect_left(sorted_strings, prefix)
+    end = start
+    while end < len(sorted_strings) and sorted_strings[end].startswith(prefix):
+        end += 1
+    return start, end
+
+
+@cached
+def search_by_ID(verbclasslist, ID, contains=False):
+    """Returns the verbclass or subclass with a given ID name, or None if there is
+    no such class. With contains=True returns the first class or subclass whose
+    identifier contains ID. Use an IDIndex for repeated lookups."""
+    for vc in iter_classes(verbclasslist):
+        if ID == vc.ID or (contains and ID in vc.ID):
+            return vc
     return None
 
 
@@ -66,14 +414,16 @@ def search_by_subclass_ID(subclass, ID):
         return None
 
 
+@cached
 def search_by_themroles(verbclasslist, themroles, all_and_only=False):
     """Returns verbclasses that contain specified thematic roles. Search is case
     sensitive. Only returns classes that contain every role in the list, with
     the option to only return classes that contain all and only those roles."""
     results = []
+    mask = ROLE_TYPES.bitmask([role for role in themroles
+                               if ROLE_TYPES.get(role) is not None])
     for vc in verbclasslist:
-        matching = [tr for tr in vc.roles if tr.role_type in themroles]
-        if len(matching) == len(vc.roles):
+        if _role_mask(vc) | mask == mask:
             if all_and_only:
                 if len(themroles) == len(vc.roles):
                     results.append(vc)
@@ -82,17 +432,29 @@ def search_by_themroles(verbclasslist, themroles, all_and_only=False):
     return results
 
 
+def _role_mask(vc):
+    # GLVerbClasses have a role_mask, for VerbClasses it is computed from the roles
+    mask = getattr(vc, 'role_mask', None)
+    if mask is None:
+        mask = 0
+        for role in vc.roles:
+            mask |= 1 << role.role_type.ID
+    return mask
+
+
+@cached
 def search_by_POS(verbclasslist, POS_list, all_and_only=False):
     """Returns frames (and their verbclass's ID) that contain specified syntactic
     roles.  Only returns frames that contain every role in the list, with the
     option to only return frames that contain all and only those roles."""
     results = []
     nocase_pos = [POS.lower() for POS in POS_list]
+    cat_ids = set([cat.ID for cat in CATEGORIES if cat.lower() in nocase_pos])
     for vc in verbclasslist:
         for frame in vc.frames:
             out = False
             for member in frame.subcat:
-                if member.cat.lower() not in nocase_pos:
+                if member.cat.ID not in cat_ids:
                     out = True
             if not out:
                 if all_and_only:
@@ -103,6 +465,7 @@ def search_by_POS(verbclasslist, POS_list, all_and_only=False):
     return results
 
 
+@cached
 def search_by_cat_and_role(verbclasses, cat_role_pairs, all_and_only=False):
     """Returns frames (and their verbclass's ID) that contain specified syntactic
     categories that have a specific semantic role (Agent, etc.)  Only returns
@@ -113,13 +476,8 @@ def search_by_cat_and_role(verbclasses, cat_role_pairs, all_and_only=False):
     for vc in verbclasses:
         for frame in vc.frames:
             failed = False
-            for cat, role in cat_role_pairs:
-                found = False
-                for member in frame.subcat:
-                    if cat == str(member.cat) and role == str(member.role):
-                        found = True
-                        break
-                if found is False:
+            for pair in cat_role_pairs:
+                if pair not in frame.subcat.multiset:
                     failed = True
             if not failed:
                 if all_and_only:
@@ -130,79 +488,135 @@ def search_by_cat_and_role(verbclasses, cat_role_pairs, all_and_only=False):
     return results
 
 
-# Four functions to perform image schema related searches, can probably be
-# somewhat simplified
+# Image schema searches. An image scheme (see imageschema.py) has lists of
+# prepositions, selectional restrictions and thematic roles. A frame matches a
+# scheme on prepositions (PP) if one of its PREP elements has one of the
+# prepositions, on restrictions (SR) if one of its PREP elements has one of the
+# restrictions with value +, and on thematic roles (TR) if one of its elements
+# has one of the roles. Frames are handed around as (frame, frame_num, ID)
+# triples where frame_num is the position of the frame in the class or
+# subclass with identifier ID.
+
+class ImageSearchEngine(object):
+
+    """Matches all frames of a list of classes and their subclasses against a list
+    of image schemes in one pass. The schemes are compiled into tables that map
+    prepositions, restrictions and roles to bitmasks of the schemes that have
+    them, so each subcat element is looked at once for all schemes. For each
+    frame three bitmasks are kept with the schemes that the frame matches on
+    prepositions, on restrictions and on roles. Searches and reverse searches
+    are then answered from those bitmasks."""
+
+    def __init__(self, schemes, verbclasslist):
+        self.schemes = list(schemes)
+        self.bits = {}
+        self.pp_table = {}
+        self.sel_res_table = {}
+        self.role_table = {}
+        for i, scheme in enumerate(self.schemes):
+            self.bits[scheme] = 1 << i
+            for table, values in ((self.pp_table, scheme.pp_list),
+                                  (self.sel_res_table, scheme.sel_res_list),
+                                  (self.role_table, scheme.role_list)):
+                for value in values:
+                    table[value] = table.get(value, 0) | 1 << i
+        self.frames = []
+        self.matches = {}
+        for vc in verbclasslist:
+            for frame, frame_num, ID in recursive_frames(vc):
+                self.frames.append((frame, frame_num, ID, vc.ID))
+                self.matches[frame] = self.match_frame(frame)
+
+    def __str__(self):
+        return "<ImageSearchEngine schemes=%s frames=%s>" \
+            % (len(self.schemes), len(self.frames))
+
+    def match_frame(self, frame):
+        """Return the bitmasks of the schemes that the frame matches on prepositions,
+        restrictions and roles."""
+        pp = sr = tr = 0
+        for member in frame.subcat:
+            words = member.role.split() if member.role is not None else []
+            if member.cat == "PREP":
+                for word in words:
+                    pp |= self.pp_table.get(word, 0)
+                for restriction in member.restrictions.restrictions:
+                    if restriction.srvalue == '+':
+                        sr |= self.sel_res_table.get(restriction.srtype, 0)
+            for word in words:
+                tr |= self.role_table.get(word, 0)
+        return pp, sr, tr
+
+    def _masks(self, frame, scheme):
+        masks = self.matches.get(frame)
+        if masks is None:
+            masks = self.match_frame(frame)
+        bit = self.bits[scheme]
+        return [mask & bit != 0 for mask in masks]
+
+    def match_types(self, frame, scheme):
+        """Return the list of ways the frame matches the scheme, with 'PP', 'SR' and
+        'TR' for prepositions, restrictions and roles."""
+        return [name for name, match
+                in zip(('PP', 'SR', 'TR'), self._masks(frame, scheme)) if match]
+
+    def reverse_search(self, frame, scheme, obligatory_theme=True,
+                       theme_only=False):
+        """Returns True if the frame matches the scheme, see
+        reverse_image_search()."""
+        pp, sr, tr = self._masks(frame, scheme)
+        if theme_only:
+            return tr
+        if obligatory_theme:
+            return (pp or sr) and tr
+        return pp or sr
 
+    def search(self, scheme, second_round=True, inclusive=False):
+        """Returns the frames that match the scheme, see image_schema_search()."""
+        second_round = second_round and len(scheme.role_list) > 0
+        results = {}
+        for frame, frame_num, ID, class_ID in self.frames:
+            pp, sr, tr = self._masks(frame, scheme)
+            if (pp or sr or (inclusive and tr)) and (tr or not second_round):
+                results.setdefault(class_ID, set()).add((frame, frame_num, ID))
+        return sorted(results.items(), key=lambda result: result[0])
+
+
+@cached
 def image_schema_search(verbclasslist, scheme, second_round=True, inclusive=False):
     """Use an ImageScheme object to find verb frames that match the scheme
     Optionally allows to make thematic roles inclusive (search results can return
     verb classes that only have a thematic role, as opposed to requiring a prep
     or selectional restriction)
     Optional second round to narrow search results to include only those verb
-    classes that contain the elements from the list of thematic roles"""
-    results = []
-    for vc in verbclasslist:
-        result = set()
-        frame_and_id_list = []
-        for i in range(len(vc.frames)):
-            frame_and_id_list.append((vc.frames[i], i, vc.ID))
-        for subclass in vc.subclasses:
-            sub_frames = recursive_frames(subclass)
-            frame_and_id_list.extend(sub_frames)
-        for frame, frame_num, ID in frame_and_id_list:
-            for member in frame.subcat:
-                if member.cat == "PREP":
-                    if len(member.role) > 0:
-                        if member.role[0] in scheme.pp_list:
-                            result.add((frame, frame_num, ID))
-                    if len(member.sel_res) > 0:
-                        for res in member.sel_res:
-                            if res in scheme.sel_res_list:
-                                result.add((frame, frame_num, ID))
-                if inclusive:
-                    if len(member.role) > 0:
-                        if member.role[0] in scheme.role_list:
-                            result.add((frame, frame_num, ID))
-        if len(result) > 0:
-            results.append((vc.ID, result))
-    if len(scheme.role_list) > 0:
-        if second_round:
-            round_2 = []
-            for vc_id, class_results in results:
-                result = set()
-                for frame, frame_num, ID in class_results:
-                    for member in frame.subcat:
-                        if len(member.role) > 0:
-                            if member.role[0] in scheme.role_list:
-                                result.add((frame, frame_num, ID))
-                if len(result) > 0:
-                    round_2.append((vc_id, result))
-            return sorted(round_2)
-    return sorted(results)
+    classes that contain the elements from the list of thematic roles. Returns
+    a sorted list of pairs of class identifiers and sets of frames, where the
+    frames are from the class and its subclasses. Use an ImageSearchEngine when
+    searching for more than one scheme."""
+    engine = ImageSearchEngine([scheme], verbclasslist)
+    return engine.search(scheme, second_round, inclusive)
 
 
+@cached
 def image_schema_search2(verbclasslist, pp_list, sem_list=None):
     """TODO: Try to find verb classes using image schema"""
-    round_1 = set()
+    round_1 = []
     for vc in verbclasslist:
         for frame in vc.frames:
             for member in frame.subcat:
-                if member.cat == 'PREP':
-                    if len(member.role) != 0:
-                        for role in member.role:
-                            if role in pp_list:
-                                round_1.add((frame, vc.ID))
+                if member.cat == 'PREP' and member.role is not None:
+                    if set(member.role.split()) & set(pp_list):
+                        round_1.append((frame, vc.ID))
+                        break
     if not sem_list:
-        return sorted(round_1)
-    else:
-        round_2 = set()
-        for frame, vc_id in round_1:
-            for member in frame.subcat:
-                if len(member.role) != 0:
-                    for rol in member.role:
-                        if rol in sem_list:
-                            round_2.add((frame, vc_id))
-    return sorted(round_2)
+        return round_1
+    round_2 = []
+    for frame, vc_id in round_1:
+        for member in frame.subcat:
+            if member.role is not None and set(member.role.split()) & set(sem_list):
+                round_2.append((frame, vc_id))
+                break
+    return round_2
 
 
 def recursive_frames(subclass):
@@ -217,30 +631,16 @@ def recursive_frames(subclass):
         return frame_and_ids
 
 
+def frame_order(frame_and_id):
+    """Sort key for (frame, frame_num, ID) triples."""
+    return (frame_and_id[2], frame_and_id[1])
+
+
 def reverse_image_search(frame, scheme, obligatory_theme=True, theme_only=False):
     """Checks to see if a particular frame belongs to an image schema
     Optionally allows to make the check for agreement on thematic roles
     obligatory.
     Also optionally allows for the search to return true if the frame only matches
     a thematic role"""
-    pp = False
-    sr = False
-    tr = False
-    for member in frame.subcat:
-        if member.cat == "PREP":
-            if len(member.role) > 0:
-                if member.role[0] in scheme.pp_list:
-                    pp = True
-            if len(member.sel_res) > 0:
-                for res in member.sel_res:
-                    if res in scheme.sel_res_list:
-                        sr = True
-        if len(member.role) > 0:
-            if member.role[0] in scheme.role_list:
-                tr = True
-    if theme_only:
-        return tr
-    if obligatory_theme:
-        return (pp or sr) and tr
-    else:
-        return (pp or sr)
+    engine = ImageSearchEngine([scheme], [])
+    return engine.reverse_search(frame, scheme, obligatory_theme, theme_only)
@@ -0,0 +1,206 @@
+"""subcats.py
+
+Matching sequences of phrases against the subcats of many frames at once.
+
+The subcat of a GLFrame is turned into a pattern with one element for each
+subcat element, the element is the category and, for PREP elements that list
+prepositions, the set of prepositions. All patterns are compiled into one
+SubcatAutomaton, a trie with the shared prefixes of the patterns. Scanning a
+sequence of phrases runs the trie from every position at once: the set of
+trie nodes reached after each phrase is a state of a deterministic automaton
+and the transitions between those states are computed when first needed and
+then cached, so after a warm-up a scan takes one dictionary lookup per
+phrase, no matter how many frames there are.
+
+Phrases are (category, text) pairs, where text is only used for PREP phrases
+and has the lowercased tokens of the phrase joined by underscores. A PREP
+phrase matches a PREP element if the element has no prepositions or if the
+text or its last word is one of them. PREP elements in VerbNet either list
+their prepositions or have selectional restrictions with preposition types
+like +src or -dest_dir, subcat_pattern() turns those types into prepositions
+using PREPOSITION_TYPES:
+
+>>> automaton = SubcatAutomaton([])
+>>> automaton.add('NP V PP.destination', [('NP', None), ('VERB', None),
+...                                       ('PREP', {'to', 'into'}), ('NP', None)])
+>>> automaton.add('NP V', [('NP', None), ('VERB', None)])
+>>> phrases = [('NP', 'carla'), ('VERB', 'slid'), ('PREP', 'into'), ('NP', 'it')]
+>>> automaton.scan(phrases)
+[(0, 2, 'NP V'), (0, 4, 'NP V PP.destination')]
+>>> automaton.match(phrases)
+['NP V PP.destination']
+
+Anything can be added as a frame, SubcatAutomaton(frames) adds GLFrames with
+the patterns made by subcat_pattern().
+
+"""
+
+
+class SubcatAutomaton(object):
+
+    """Automaton that finds all frames whose pattern occurs in a sequence of
+    phrases. Nodes of the trie are numbered, with the root as node 0, the
+    edges dictionary maps a node to a dictionary from elements to nodes, and
+    the depths and frames lists have the length of the pattern that leads to
+    a node and the frames with that pattern."""
+
+    def __init__(self, frames):
+        self.edges = [{}]
+        self.depths = [0]
+        self.frames = [[]]
+        self.prepositions = set()
+        self.transitions = {}
+        self.outputs = {}
+        self.start = frozenset([0])
+        for frame in frames:
+            self.add(frame, subcat_pattern(frame))
+
+    def __str__(self):
+        return "<SubcatAutomaton nodes=%s states=%s>" \
+            % (len(self.edges), len(self.transitions))
+
+    def __len__(self):
+        return sum([len(frames) for frames in self.frames])
+
+    def add(self, frame, pattern):
+        """Add a frame with a pattern, which is a list of (category, prepositions)
+        pairs where prepositions is None or a set of prepositions. The cached
+        transitions are dropped since they may have changed."""
+        node = 0
+        for cat, prepositions in pattern:
+            if prepositions is not None:
+                prepositions = frozenset(prepositions)
+                self.prepositions.update(prepositions)
+            element = (cat, prepositions)
+            child = self.edges[node].get(element)
+            if child is None:
+                child = len(self.edges)
+                self.edges.append({})
+                self.depths.append(self.depths[node] + 1)
+                self.frames.append([])
+                self.edges[node][element] = child
+            node = child
+        self.frames[node].append(frame)
+        self.transitions = {}
+        self.outputs = {}
+
+    def symbol(self, phrase):
+        """Return the symbol for a phrase, which is its category and, for PREP
+        phrases, the set of prepositions in the automaton that the phrase can
+        be."""
+        cat, text = phrase
+        if cat != 'PREP' or not text:
+            return (cat, None)
+        candidates = [text, text.rsplit('_', 1)[-1]]
+        return (cat, frozenset([p for p in candidates if p in self.prepositions]))
+
+    def next_state(self, state, symbol):
+        """Return the state after reading the symbol in a state. A state is the set
+        of trie nodes that can be reached, it always includes the root so that
+        matches can start at any position."""
+        transitions = self.transitions.setdefault(state, {})
+        next_state = transitions.get(symbol)
+        if next_state is None:
+            cat, candidates = symbol
+            nodes = set([0])
+            for node in state:
+                for (element_cat, prepositions), child in self.edges[node].items():
+                    if element_cat != cat:
+                        continue
+                    if prepositions is None or (candidates and prepositions & candidates):
+                        nodes.add(child)
+            next_state = frozenset(nodes)
+            transitions[symbol] = next_state
+        return next_state
+
+    def state_outputs(self, state):
+        """Return the (depth, frames) pairs of the nodes in the state that end a
+        pattern, with the shortest patterns first."""
+        outputs = self.outputs.get(state)
+        if outputs is None:
+            nodes = sorted([(self.depths[node], node) for node in state])
+            outputs = [(depth, self.frames[node])
+                       for depth, node in nodes if self.frames[node]]
+            self.outputs[state] = outputs
+        return outputs
+
+    def scan(self, phrases):
+        """Return a (start, end, frame) triple for every occurrence of the pattern
+        of a frame in the phrases, where start and end are phrase numbers. The
+        triples are ordered on the end and then on the start, from late to
+        early. Frames with the same pattern are in the order in which they were
+        added."""
+        matches = []
+        state = self.start
+        for end, phrase in enumerate(phrases, 1):
+            state = self.next_state(state, self.symbol(phrase))
+            for depth, frames in self.state_outputs(state):
+                for frame in frames:
+                    matches.append((end - depth, end, frame))
+        return matches
+
+    def match(self, phrases):
+        """Return the frames whose pattern matches all of the phrases."""
+        return [frame for start, end, frame in self.scan(phrases)
+                if start == 0 and end == len(phrases)]
+
+
+def subcat_pattern(frame):
+    """Return the pattern of the subcat of a GLFrame."""
+    pattern = []
+    for element in frame.subcat:
+        prepositions = None
+        if element.cat == 'PREP' and element.role:
+            prepositions = set(element.role.lower().split())
+        elif element.cat == 'PREP':
+            prepositions = restricted_prepositions(element.restrictions)
+        pattern.append((element.cat, prepositions))
+    return pattern
+
+
+def restricted_prepositions(restrictions):
+    """Return the set of prepositions allowed by the selectional restrictions of a
+    PREP element, or None if the restrictions have no known preposition type.
+    With 'or' logic the prepositions of the + types are combined, otherwise
+    they are intersected, and the prepositions of the - types are removed. If
+    there are only - types they are removed from the spatial prepositions."""
+    if restrictions is None or restrictions.is_empty():
+        return None
+    positive = []
+    negative = set()
+    for restriction in restrictions.restrictions:
+        prepositions = PREPOSITION_TYPES.get(restriction.srtype)
+        if prepositions is None:
+            continue
+        if restriction.srvalue == '-':
+            negative.update(prepositions)
+        else:
+            positive.append(prepositions)
+    if not positive and not negative:
+        return None
+    if not positive:
+        allowed = set(PREPOSITION_TYPES['spatial'])
+    elif restrictions.logic == 'or':
+        allowed = set().union(*positive)
+    else:
+        allowed = set(positive[0]).intersection(*positive[1:])
+    return allowed - negative
+
+
+# Prepositions of the preposition types used in the selectional restrictions
+# of PREP elements, after the preposition hierarchy of VerbNet.
+PREPOSITION_TYPES = {
+    'loc': frozenset("""about above against along alongside amid among amongst
+        around astride at athwart before behind beside between beyond by from
+        in in_front_of inside near next_to off on opposite out_of outside over
+        round throughout under underneath upon within""".split()),
+    'src': frozenset("from out out_of off off_of".split()),
+    'dir': frozenset("""across along around down over past round through
+        towards up""".split()),
+    'dest_conf': frozenset("into onto".split()),
+    'dest_dir': frozenset("for at to towards".split()),
+}
+PREPOSITION_TYPES['dest'] = PREPOSITION_TYPES['dest_conf'] | PREPOSITION_TYPES['dest_dir']
+PREPOSITION_TYPES['path'] = (PREPOSITION_TYPES['src'] | PREPOSITION_TYPES['dir']
+                             | PREPOSITION_TYPES['dest'])
+PREPOSITION_TYPES['spatial'] = PREPOSITION_TYPES['path'] | PREPOSITION_TYPES['loc']
@@ -0,0 +1,116 @@
+"""symbols.py
+
+Symbol tables for the small vocabularies that occur over and over again in
+VerbNet, like thematic roles, predicate names and syntactic categories.
+
+Interning a string in a SymbolTable returns a Symbol, which is a string that
+also has a small integer identifier in its ID attribute. Every occurrence of a
+string is replaced by the same Symbol so symbols from the same table can be
+compared by identity or by their identifiers:
+
+>>> agent = ROLE_TYPES.intern('Agent')
+>>> agent == 'Agent'
+True
+>>> agent is ROLE_TYPES.intern('Agent')
+True
+>>> ROLE_TYPES[agent.ID] is agent
+True
+
+Sets of symbols can be stored as bitmasks over the identifiers:
+
+>>> theme = ROLE_TYPES.intern('Theme')
+>>> mask = ROLE_TYPES.bitmask(['Agent', 'Theme'])
+>>> mask & ROLE_TYPES.bitmask(['Agent']) == ROLE_TYPES.bitmask(['Agent'])
+True
+
+Identifiers are assigned in order of first use and are only meaningful within
+one process. When a symbol is pickled only its table and its string are stored
+and unpickling interns it again, so identity and identifiers also hold for
+objects that come from a cache or from another process.
+
+"""
+
+
+class Symbol(str):
+
+    """A string that was interned in a SymbolTable, the ID attribute holds the
+    identifier of the symbol in that table and the table attribute holds the
+    name of the table."""
+
+    def __reduce__(self):
+        return (lookup_symbol, (self.table, str(self)))
+
+
+class SymbolTable(object):
+
+    """Maps strings to symbols and identifiers to symbols."""
+
+    def __init__(self, name):
+        self.name = name
+        self.symbols = {}
+        self.symbol_list = []
+        TABLES[name] = self
+
+    def __len__(self):
+        return len(self.symbol_list)
+
+    def __iter__(self):
+        return iter(self.symbol_list)
+
+    def __getitem__(self, ID):
+        return self.symbol_list[ID]
+
+    def intern(self, string):
+        """Return the symbol for the string, adding it to the table if needed. None
+        is returned as is."""
+        if string is None:
+            return None
+        symbol = self.symbols.get(string)
+        if symbol is None:
+            symbol = Symbol(string)
+            symbol.ID = len(self.symbol_list)
+            symbol.table = self.name
+            self.symbols[string] = symbol
+            self.symbol_list.append(symbol)
+        return symbol
+
+    def get(self, string):
+        """Return the symbol for the string, or None if it is not in the table."""
+        return self.symbols.get(string)
+
+    def bitmask(self, strings):
+        """Return an integer with a bit set for the identifier of each string, or None
+        if one of the strings is not in the table. Bitmasks are a cheap way to
+        store sets of symbols and to compare them."""
+        mask = 0
+        for string in strings:
+            symbol = self.symbols.get(string)
+            if symbol is None:
+                return None
+            mask |= 1 << symbol.ID
+        return mask
+
+
+def lookup_symbol(table_name, string):
+    return TABLES[table_name].intern(string)
+
+
+TABLES = {}
+
+# Thematic roles and the values of NP elements in the syntax of frames
+ROLE_TYPES = SymbolTable('role_types')
+
+# Values of the other syntactic elements, these are mostly prepositions
+LEXICAL = SymbolTable('lexical')
+
+# Syntactic categories like NP, VERB and PREP
+CATEGORIES = SymbolTable('categories')
+
+# Predicate names like motion and cause
+PREDICATES = SymbolTable('predicates')
+
+# Types and values of predicate arguments, like Event and during(E)
+ARGUMENTS = SymbolTable('arguments')
+
+# Values and types of selectional and syntactic restrictions, like + and animate
+RESTRICTIONS = SymbolTable('restrictions')
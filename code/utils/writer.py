@@ -7,6 +7,8 @@ Utilities to write HTML files.
 
 import os
 
+from .profiler import PROFILER
+
 
 class HtmlWriter(object):
 
@@ -21,22 +23,37 @@ class HtmlWriter(object):
         self.index = open(os.path.join(self.directory, 'index.html'), 'w')
         self.start()
 
-    def write(self, gl_verb_classes, header):
-        group = header.lower().replace(' ', '-')
+    def write(self, gl_verb_classes, header, class_ids=None):
+        """Write the classes to the index under the header and write a file for
+        each class. If class_ids is given then only the files for the classes
+        with those identifiers are written, which assumes that the files for
+        the other classes were written before."""
         self.index.write("<td>\n")
         self.index.write("<table class=bordered cellpadding=8 cellspacing=0>\n")
         self.index.write("<tr class=header><td>%s</a>\n" % header)
         for verbclass in gl_verb_classes:
-            infix = group + '-' if group else ''
-            class_file = "vnclass-%s%s.html" % (infix, verbclass.ID)
+            class_file = class_file_name(header, verbclass.ID)
             self.index.write("<tr class=vnlink><td><a href=\"%s\">%s</a>\n"
                              % (class_file, verbclass.ID))
-            fh = open(os.path.join(self.directory, class_file), 'w')
+            if class_ids is not None and verbclass.ID not in class_ids:
+                continue
             url = os.path.join(self.verbnet_url, verbclass.ID + '.php')
-            HtmlClassWriter(fh, verbclass, url).write()
+            with open(os.path.join(self.directory, class_file), 'w') as fh:
+                HtmlClassWriter(fh, verbclass, url).write()
+                PROFILER.count('html_files')
+                PROFILER.count('bytes_written', fh.tell())
         self.index.write("</table>\n")
         self.index.write("</td>\n")
 
+    def remove(self, headers, class_ids):
+        """Remove the files that were written for the classes with the identifiers
+        under any of the headers."""
+        for header in headers:
+            for class_ID in class_ids:
+                path = os.path.join(self.directory, class_file_name(header, class_ID))
+                if os.path.exists(path):
+                    os.remove(path)
+
     def start(self):
         self.index.write("<html>\n")
         self.index.write("<head>\n")
@@ -60,6 +77,16 @@ class HtmlWriter(object):
         self.index.write("</table>\n")
         self.index.write("</body>\n")
         self.index.write("</html>\n")
+        PROFILER.count('html_files')
+        PROFILER.count('bytes_written', self.index.tell())
+        self.index.close()
+
+
+def class_file_name(header, class_ID):
+    """Return the name of the file for a class written under the header."""
+    group = header.lower().replace(' ', '-')
+    infix = group + '-' if group else ''
+    return "vnclass-%s%s.html" % (infix, class_ID)
 
 
 class HtmlClassWriter(object):
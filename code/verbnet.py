@@ -6,33 +6,146 @@ access to the data.
 """
 
 import os
+import hashlib
+import pickle
+import zipfile
+import tarfile
+import multiprocessing
 import bs4
+from lxml import etree
 
 from config import VERBNET_PATH
+from utils.symbols import ROLE_TYPES, LEXICAL, CATEGORIES, PREDICATES
+from utils.symbols import ARGUMENTS, RESTRICTIONS
+from utils import symbols
+from utils.profiler import PROFILER
+
+
+# Parser backends that can be handed to VerbNet and VerbClass, 'bs4' builds a
+# BeautifulSoup tree and 'lxml' uses the lxml tree directly, which is faster.
+PARSERS = ('bs4', 'lxml')
+
+# Name of the file in the VerbNet directory that stores the cached classes, used
+# when VerbNet is created with cache=True, see ClassCache.
+CACHE_FILE = '.verbnetgl-cache.pickle'
 
 
 class VerbNet(object):
 
-    def __init__(self, limit=None, file_list=None):
+    def __init__(self, limit=None, file_list=None, parser='bs4', workers=None,
+                 cache=False, keep_soup=True, lazy=False, path=None):
         """Parse verbnet files and create instances of VerbClass. Read all verbnet
         files, but restrict the number of files to read if limit is not None, or
-        read filenames from a file if file_list is given."""
-        if file_list is None:
-            fnames = [f for f in os.listdir(VERBNET_PATH) if f.endswith(".xml")]
-            if limit is not None:
-                fnames = fnames[:limit]
-        else:
-            fnames = ["%s.xml" % f.strip() for f in open(file_list).read().split()]
-        fnames = [os.path.join(VERBNET_PATH, fname) for fname in fnames]
+        read filenames from a file if file_list is given. Files are read from
+        path, which is VERBNET_PATH by default and which is either a directory
+        or a zip or tar archive, see Archive. The parser argument
+        selects the XML backend, it is one of the values in PARSERS. If workers
+        is larger than 1 then the files are parsed by a pool of that many
+        processes, see load_classes(). If cache is True then classes are taken
+        from the cache file in the VerbNet directory if their source file did
+        not change, cache can also be the path of some other cache file. If
+        keep_soup is False then all classes release their soup right after they
+        are created, which frees the XML trees. If lazy is True then instances
+        of LazyVerbClass are created and files are only parsed when a class is
+        used, in that case the workers, cache and keep_soup arguments are not
+        used."""
+        if parser not in PARSERS:
+            raise ValueError("unknown parser: %s" % parser)
+        self.path = VERBNET_PATH if path is None else path
+        if cache is True:
+            if is_archive(self.path):
+                cache = self.path + CACHE_FILE
+            else:
+                cache = os.path.join(self.path, CACHE_FILE)
+        self.limit = limit
+        self.file_list = file_list
+        self.parser = parser
+        self.workers = workers
+        self.cache = cache
+        self.keep_soup = keep_soup
+        self.lazy = lazy
+        self.fingerprints = {}
         self.classes = []
         self.classes_idx = {}
-        for fname in fnames:
-            vc = VerbClass(fname)
+        for vc in self._load(self._file_names()):
             self.classes.append(vc)
             self.classes_idx[vc.ID] = vc
         count = len(self.classes)
         print("Loaded %s class%s" % (count, '' if count == 1 else 'es'))
 
+    def _file_names(self):
+        if is_archive(self.path):
+            members = open_archive(self.path).names()
+            names = {os.path.basename(member): member for member in members}
+        else:
+            names = {f: f for f in os.listdir(self.path) if f.endswith(".xml")}
+        if self.file_list is None:
+            fnames = list(names.values())
+            if self.limit is not None:
+                fnames = fnames[:self.limit]
+        else:
+            fnames = [names.get("%s.xml" % f.strip(), "%s.xml" % f.strip())
+                      for f in open(self.file_list).read().split()]
+        return [os.path.join(self.path, fname) for fname in fnames]
+
+    def _load(self, fnames):
+        """Create the VerbClass instances for the files and store the fingerprints of
+        the files, which are taken before parsing so that a file that changes
+        while being parsed will be parsed again by reload()."""
+        PROFILER.count('files_loaded', len(fnames))
+        with PROFILER.timer('load_verbnet'):
+            fingerprints = {fname: fingerprint(fname) for fname in fnames}
+            if self.lazy:
+                verbclasses = [LazyVerbClass(fname, parser=self.parser)
+                               for fname in fnames]
+            elif self.cache:
+                verbclasses = ClassCache(self.cache).load(
+                    fnames, self.parser, self.workers)
+            else:
+                verbclasses = load_classes(
+                    fnames, self.parser, self.workers, self.keep_soup)
+        self.fingerprints.update(fingerprints)
+        return verbclasses
+
+    def reload(self):
+        """Check the VerbNet files for changes since they were loaded and update the
+        classes and classes_idx variables in place. Only files that were added or
+        changed are parsed. Changed classes keep their position in the classes
+        list and new classes are added at the end. Added files are only found
+        when VerbNet was not created with a limit. Returns a list of pairs of the
+        old and the new VerbClass, where the old class is None for added files
+        and the new class is None for removed files. The files are parsed before
+        anything is changed, so if parsing fails nothing changes and the next
+        reload finds the same changes."""
+        if self.limit is None:
+            fnames = [f for f in self._file_names() if file_exists(f)]
+        else:
+            fnames = [f for f in self.fingerprints if file_exists(f)]
+        old_classes = {vc.fname: vc for vc in self.classes}
+        current = set(fnames)
+        removed = [f for f in self.fingerprints if f not in current]
+        stale = [f for f in fnames
+                 if f not in self.fingerprints
+                 or fingerprint(f) != self.fingerprints[f]]
+        new_classes = self._load(stale)
+        changes = []
+        for fname in removed:
+            old = old_classes[fname]
+            self.classes.remove(old)
+            del self.classes_idx[old.ID]
+            del self.fingerprints[fname]
+            changes.append((old, None))
+        for fname, new in zip(stale, new_classes):
+            old = old_classes.get(fname)
+            if old is None:
+                self.classes.append(new)
+            else:
+                self.classes[self.classes.index(old)] = new
+                del self.classes_idx[old.ID]
+            self.classes_idx[new.ID] = new
+            changes.append((old, new))
+        return changes
+
 
 class VerbClass(object):
 
@@ -40,15 +153,17 @@ class VerbClass(object):
     a Verbnet XML file in which case there may be a list of subclasses included or
     it could represent a subclass from one of the files."""
 
-    def __init__(self, fname, soup=None):
+    def __init__(self, fname, soup=None, parser='bs4'):
         """Initialize a VerbClass from either a Verbnet XML file or a soup object that
-        represents a subclass."""
+        represents a subclass. When reading from a file, the parser argument
+        determines what kind of object the soup is, see read_xml()."""
         self.fname = fname
         self.soup = soup
         if soup is None:
-            self.soup = bs4.BeautifulSoup(open(fname), "lxml-xml").VNCLASS
+            self.soup = read_xml(fname, parser)
         self.ID = self.soup.get("ID")
         self.name = self.soup.name
+        self.frame_flags = {}
         self._initialize_members()
         self._initialize_frames()
         self._initialize_roles()
@@ -82,21 +197,79 @@ class VerbClass(object):
         subs = self.soup.SUBCLASSES.find_all("VNSUBCLASS", recursive=False)
         self.subclasses = [VerbClass(self.fname, soup=sub) for sub in subs]
 
+    def release_soup(self):
+        """Remove the references to the soup from the class and everything in it,
+        including the subclasses."""
+        for obj in self.members + self.frames + self.roles + self.subclasses:
+            obj.release_soup()
+        self.soup = None
+
     def is_motion(self):
         """Return True if one of the frames is a motion frame."""
-        return len([f for f in self.frames if f.is_motion()]) > 0
+        return self._frame_flag('is_motion')
 
     def is_change_of_possession(self):
         """Return True if one of the frames is a ch_of_poss frame."""
-        return len([f for f in self.frames if f.is_change_of_possession()]) > 0
+        return self._frame_flag('is_change_of_possession')
 
     def is_transfer_of_info(self):
         """Return True if one of the frames is a tr_of_info frame."""
-        return len([f for f in self.frames if f.is_transfer_of_info()]) > 0
+        return self._frame_flag('is_transfer_of_info')
 
     def is_change_of_state(self):
         """Return True if one of the frames is a ch_of_state frame."""
-        return len([f for f in self.frames if f.is_change_of_state()]) > 0
+        return self._frame_flag('is_change_of_state')
+
+    def _frame_flag(self, method):
+        """Return True if the Frame method with the given name returns True for
+        one of the frames. Frames do not change so the result is cached."""
+        flag = self.frame_flags.get(method)
+        if flag is None:
+            flag = any(getattr(frame, method)() for frame in self.frames)
+            self.frame_flags[method] = flag
+        return flag
+
+
+class LazyVerbClass(VerbClass):
+
+    """A VerbClass that postpones all work until it is needed. Initially it only
+    has its file name and identifier, the file is parsed when the soup is first
+    needed and the members, frames, roles and subclasses are each created when
+    they are first accessed. Subclasses are also instances of LazyVerbClass."""
+
+    def __init__(self, fname, soup=None, parser='bs4'):
+        self.fname = fname
+        self.parser = parser
+        self.frame_flags = {}
+        if soup is None:
+            self.ID = read_class_ID(fname)
+        else:
+            self.soup = soup
+            self.ID = soup.get("ID")
+
+    def __getattr__(self, attr):
+        # only called for attributes that were not created yet
+        if attr == 'soup':
+            self.soup = read_xml(self.fname, self.parser)
+        elif attr == 'name':
+            self.name = self.soup.name
+        elif attr in ('members', 'member_names'):
+            self._initialize_members()
+        elif attr == 'frames':
+            self._initialize_frames()
+        elif attr == 'roles':
+            self._initialize_roles()
+        elif attr == 'subclasses':
+            self._initialize_subclasses()
+        else:
+            raise AttributeError(attr)
+        return self.__dict__[attr]
+
+    def _initialize_subclasses(self):
+        """Create a LazyVerbClass instance for every subclass listed."""
+        subs = self.soup.SUBCLASSES.find_all("VNSUBCLASS", recursive=False)
+        self.subclasses = [LazyVerbClass(self.fname, soup=sub, parser=self.parser)
+                           for sub in subs]
 
 
 class Member(object):
@@ -104,6 +277,8 @@ class Member(object):
     """Represents a single member of a VerbClass, with associated name, WordNet
     category and PropBank grouping."""
 
+    __slots__ = ('soup', 'name', 'wn', 'grouping')
+
     def __init__(self, soup):
         self.soup = soup
         self.name = self.soup.get('name')
@@ -113,6 +288,9 @@ class Member(object):
     def __str__(self):
         return "<Member %s %s %s>" % (self.name, self.wn, self.grouping)
 
+    def release_soup(self):
+        self.soup = None
+
 
 class Frame(object):
 
@@ -128,13 +306,19 @@ class Frame(object):
         self.syntax = self.get_syntax()
         self.predicates = [Predicate(p)
                            for p in self.soup.SEMANTICS.find_all("PRED")]
+        self._initialize_indexes()
 
     def __str__(self):
         return "<Frame %s [%s]>" % (self.class_ID, self.description)
 
+    def release_soup(self):
+        self.soup = None
+        for obj in self.syntax + self.predicates:
+            obj.release_soup()
+
     def get_syntax(self):
         syntax_elements = [c for c in self.soup.SYNTAX.children
-                           if isinstance(c, bs4.element.Tag)]
+                           if isinstance(c, (bs4.element.Tag, LxmlTag))]
         roles = [SyntacticRole(soup, self) for soup in syntax_elements]
         # there used to be a test for the value of pos, now just write a warning
         # if we find a missing pos
@@ -143,9 +327,21 @@ class Frame(object):
                 print("Warning: empty pos in %s" % role)
         return roles
 
+    def _initialize_indexes(self):
+        """Create the indexes used by find_predicates() and find_predicates_with_argval().
+        The predicate index maps predicate values to lists of predicates and the
+        argument index maps argument values to lists of predicate-argument
+        pairs, both lists are in the order of the predicates in the frame."""
+        self.predicate_index = {}
+        self.argument_index = {}
+        for pred in self.predicates:
+            self.predicate_index.setdefault(pred.value, []).append(pred)
+            for argument in pred.args:
+                self.argument_index.setdefault(argument[1], []).append([pred, argument])
+
     def find_predicates(self, pred_value):
         """Returns the list of Predicates where the value equals pred_value."""
-        return [p for p in self.predicates if p.value == pred_value]
+        return list(self.predicate_index.get(pred_value, []))
 
     def find_predicates_with_argval(self, argvalue):
         """Returns all those predicates that have an argument value equal to
@@ -153,28 +349,23 @@ class Frame(object):
         <ThemRole,Theme>. Does not just return the predicate but a pair of
         predicate and argument which means that in some cases the same predicate
         could be returned more than once, but with different arguments."""
-        answer = []
-        for pred in self.predicates:
-            for argument in pred.args:
-                if argument[1] == argvalue:
-                    answer.append([pred, argument])
-        return answer
+        return [list(pair) for pair in self.argument_index.get(argvalue, [])]
 
     def is_motion(self):
         """Return True if one of the predicates is a motion predicate."""
-        return True if self.find_predicates('motion') else False
+        return 'motion' in self.predicate_index
 
     def is_change_of_possession(self):
         """Return True if one of the predicates is a ch_of_poss predicate."""
-        return True if self.find_predicates_with_argval('ch_of_poss') else False
+        return 'ch_of_poss' in self.argument_index
 
     def is_transfer_of_info(self):
         """Returns True if one of the predicates has a tr_of_info predicate."""
-        return True if self.find_predicates_with_argval('tr_of_info') else False
+        return 'tr_of_info' in self.argument_index
 
     def is_change_of_state(self):
         """Returns True if one of the predicates is a ch_of_state predicate."""
-        return True if self.find_predicates_with_argval('ch_of_state') else False
+        return 'ch_of_state' in self.argument_index
 
 
 class ThematicRole(object):
@@ -185,7 +376,7 @@ class ThematicRole(object):
 
     def __init__(self, soup):
         self.soup = soup
-        self.role_type = self.soup.get('type')
+        self.role_type = ROLE_TYPES.intern(self.soup.get('type'))
         self.sel_restrictions = SelectionalRestrictions(self.soup.SELRESTRS)
 
     def __str__(self):
@@ -194,6 +385,10 @@ class ThematicRole(object):
         else:
             return "%s / %s" % (self.role_type, self.sel_restrictions)
 
+    def release_soup(self):
+        self.soup = None
+        self.sel_restrictions.release_soup()
+
     def html(self):
         def role(text):
             return "<span class=role>%s</span>" % text
@@ -207,15 +402,21 @@ class Predicate(object):
 
     """Represents the different predicates assigned to a frame"""
 
+    __slots__ = ('soup', 'value', 'args')
+
     def __init__(self, soup):
         self.soup = soup
-        self.value = self.soup.get('value')
+        self.value = PREDICATES.intern(self.soup.get('value'))
         args = self.soup.find_all('ARG')
-        self.args = [(arg.get('type'), arg.get('value')) for arg in args]
+        self.args = [(ARGUMENTS.intern(arg.get('type')),
+                      ARGUMENTS.intern(arg.get('value'))) for arg in args]
 
     def __str__(self):
         return "%s(%s)" % (self.value, ', '.join([a[1] for a in self.args]))
 
+    def release_soup(self):
+        self.soup = None
+
     def find_arguments(self, arg):
         """Return all arguments in self.args where the arg paramter matches one of
         the argument's elements. Note that an argument is a pair of an argument type
@@ -231,11 +432,14 @@ class SyntacticRole(object):
 
     """Represents a syntactic role assigned to a frame"""
 
+    __slots__ = ('soup', 'frame', 'pos', 'value', 'restrictions')
+
     def __init__(self, soup, frame):
         self.soup = soup
         self.frame = frame
-        self.pos = self.soup.name
-        self.value = self.soup.get('value')
+        self.pos = CATEGORIES.intern(self.soup.name)
+        table = ROLE_TYPES if self.pos == 'NP' else LEXICAL
+        self.value = table.intern(self.soup.get('value'))
         self.restrictions = None
         self.restrictions = SyntacticRestrictions(self.soup.SYNRESTRS)
         # some syntactic roles have semantic selection restrictions on them, try
@@ -249,6 +453,10 @@ class SyntacticRole(object):
         return "<SyntacticRole pos=%s value=%s restrictions=%s>" \
             % (self.pos, self.value, self.restrictions)
 
+    def release_soup(self):
+        self.soup = None
+        self.restrictions.release_soup()
+
     def get_restrictions(self):
         """Returns the restrictions for the role as defined on the thematic role
         that the syntactic role fullfills."""
@@ -270,6 +478,11 @@ class Restrictions(object):
     def is_empty(self):
         return self.restrictions == []
 
+    def release_soup(self):
+        self.soup = None
+        for restriction in self.restrictions:
+            restriction.release_soup()
+
     def set_restrictions(self, tagname):
         """Set the restrictions given the tagname. Make sure that self.logic is set to
         None if there are no restrictions."""
@@ -321,15 +534,286 @@ class Restriction(object):
     """Stores the content of SELRESTR or SYNRESTR, which has 'Value' and 'type'
     attributes, for example <SELRESTR Value="+" type="animate"/>."""
 
+    __slots__ = ('soup', 'name', 'srvalue', 'srtype')
+
     def __init__(self, soup):
         self.soup = soup
         self.name = self.soup.name
-        self.srvalue = self.soup.get('Value')
-        self.srtype = self.soup.get('type')
+        self.srvalue = RESTRICTIONS.intern(self.soup.get('Value'))
+        self.srtype = RESTRICTIONS.intern(self.soup.get('type'))
 
     def __str__(self):
         return "%s%s" % (self.srvalue, self.srtype)
 
+    def release_soup(self):
+        self.soup = None
+
+
+class ClassCache(object):
+
+    """Persistent cache of VerbClass instances, stored as a pickle file. Each class
+    is stored with the fingerprint of the file it was created from, which is the
+    modification time and size of the file, and a cached class is only used if
+    its file still has the same fingerprint. The cache as a whole is ignored
+    when the source of this module changed since it was written. Classes are
+    stored without their soups."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.read()
+
+    def read(self):
+        """Read the entries from the cache file, which maps file names to pairs of
+        a fingerprint and a VerbClass."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as fh:
+                version, entries = pickle.load(fh)
+        except Exception as e:
+            print("Warning: cannot read cache %s (%s)" % (self.path, e))
+            return
+        if version == module_version():
+            self.entries = entries
+
+    def write(self):
+        """Write the entries to the cache file, dropping entries for files that do
+        not exist anymore. Writes to a temporary file first so that readers never
+        see a partially written cache."""
+        self.entries = {fname: entry for fname, entry in self.entries.items()
+                        if file_exists(fname)}
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as fh:
+                pickle.dump((module_version(), self.entries), fh,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print("Warning: cannot write cache %s (%s)" % (self.path, e))
+
+    def load(self, fnames, parser='bs4', workers=None):
+        """Return the VerbClass instances for fnames, only parsing those files that
+        are not in the cache or that changed since they were cached."""
+        fingerprints = {fname: fingerprint(fname) for fname in fnames}
+        stale = [fname for fname in fnames
+                 if fname not in self.entries
+                 or self.entries[fname][0] != fingerprints[fname]]
+        for verbclass in load_classes(stale, parser, workers, keep_soup=False):
+            self.entries[verbclass.fname] = (fingerprints[verbclass.fname], verbclass)
+        if stale:
+            self.write()
+        return [self.entries[fname][1] for fname in fnames]
+
+
+class Archive(object):
+
+    """Gives access to the VerbNet files in a zip or tar archive without extracting
+    them. The list of members is read once when the archive is opened. Files in
+    an archive are named by joining the path of the archive and the name of the
+    member, for example verbnet-3.3.zip/verbnet-3.3/slide-11.2.xml, and the
+    functions open_file(), fingerprint() and file_exists() accept such names
+    as well as names of regular files."""
+
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.fingerprint = fingerprint(path)
+        if zipfile.is_zipfile(path):
+            self.zipfile = zipfile.ZipFile(path)
+            self.tarfile = None
+            self.members = {info.filename: info for info in self.zipfile.infolist()
+                            if info.filename.endswith('.xml')}
+        else:
+            self.zipfile = None
+            self.tarfile = tarfile.open(path)
+            self.members = {info.name: info for info in self.tarfile.getmembers()
+                            if info.isfile() and info.name.endswith('.xml')}
+
+    def names(self):
+        """Return the names of all XML members in the order of the archive."""
+        return list(self.members)
+
+    def open(self, name):
+        """Return a binary file object for the member."""
+        if self.zipfile is not None:
+            return self.zipfile.open(self.members[name])
+        return self.tarfile.extractfile(self.members[name])
+
+    def member_fingerprint(self, name):
+        info = self.members[name]
+        if self.zipfile is not None:
+            return (info.date_time, info.file_size, info.CRC)
+        return (info.mtime, info.size)
+
+
+# Archives that were opened by this process, indexed on their paths
+ARCHIVES = {}
+
+
+def is_archive(path):
+    """Return True if path is a zip or tar file."""
+    return os.path.isfile(path) \
+        and (zipfile.is_zipfile(path) or tarfile.is_tarfile(path))
+
+
+def open_archive(path):
+    """Return the Archive for path. An archive is opened once per process and then
+    only opened again when the archive file changed. Processes do not share
+    archives since they would share the position in the underlying file."""
+    archive = ARCHIVES.get(path)
+    if archive is None or archive.pid != os.getpid() \
+       or archive.fingerprint != fingerprint(path):
+        archive = Archive(path)
+        ARCHIVES[path] = archive
+    return archive
+
+
+def split_archive_name(fname):
+    """Split a name like verbnet.zip/verbnet/slide-11.2.xml into the path of the
+    archive and the name of the member. Returns None for the archive if there
+    is no archive in the name."""
+    path = fname
+    while path and not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    if path and path != fname and os.path.isfile(path):
+        return path, os.path.relpath(fname, path).replace(os.sep, '/')
+    return None, fname
+
+
+def open_file(fname):
+    """Return a binary file object for a regular file or a file in an archive."""
+    archive, member = split_archive_name(fname)
+    if archive is None:
+        return open(fname, 'rb')
+    return open_archive(archive).open(member)
+
+
+def file_exists(fname):
+    """Return True if the regular file or the file in an archive exists."""
+    archive, member = split_archive_name(fname)
+    if archive is None:
+        return os.path.isfile(fname)
+    return member in open_archive(archive).members
+
+
+def fingerprint(fname):
+    """Return the modification time and size of a file. For a file in an archive
+    the values stored in the archive are used."""
+    archive, member = split_archive_name(fname)
+    if archive is not None:
+        return open_archive(archive).member_fingerprint(member)
+    stat = os.stat(fname)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def module_version():
+    """Return a hash of the source of this module and of utils/symbols.py, whose
+    Symbol objects are also pickled, used to make sure that cached classes
+    were created by the current code."""
+    md5 = hashlib.md5()
+    for fname in (__file__, symbols.__file__):
+        with open(fname, 'rb') as fh:
+            md5.update(fh.read())
+    return md5.hexdigest()
+
+
+def load_classes(fnames, parser='bs4', workers=None, keep_soup=True):
+    """Create VerbClass instances for all files, using a pool of worker processes
+    if workers is larger than 1. The classes are returned in the same order as
+    the file names. If keep_soup is False then each class releases its soup as
+    soon as it is created so that only one XML tree is alive at any time. Soups
+    cannot be handed from the workers to this process so classes created by
+    the pool never have them."""
+    if workers is None or workers < 2:
+        verbclasses = []
+        for fname in fnames:
+            verbclass = VerbClass(fname, parser=parser)
+            if not keep_soup:
+                verbclass.release_soup()
+            verbclasses.append(verbclass)
+        return verbclasses
+    chunksize = max(1, len(fnames) // (workers * 4))
+    with multiprocessing.Pool(workers) as pool:
+        return PROFILER.starmap(pool, _load_class,
+                                [(fname, parser) for fname in fnames], chunksize)
+
+
+def _load_class(fname, parser):
+    verbclass = VerbClass(fname, parser=parser)
+    verbclass.release_soup()
+    return verbclass
+
+
+def read_class_ID(fname):
+    """Return the identifier of the class in a VerbNet file, only the start tag of
+    the VNCLASS element is parsed."""
+    parser = etree.XMLPullParser(events=('start',), recover=True)
+    with open_file(fname) as fh:
+        for chunk in iter(lambda: fh.read(1024), b''):
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                return element.get("ID")
+
+
+def read_xml(fname, parser='bs4'):
+    """Return the VNCLASS element of a VerbNet file, which can be a regular file or
+    a file in an archive. With the bs4 parser this is a BeautifulSoup tag, with
+    the lxml parser it is an LxmlTag. Parsing is profiled, but not when it is
+    done in worker processes."""
+    PROFILER.count('files_parsed')
+    with PROFILER.timer('parse_xml'), open_file(fname) as fh:
+        if parser == 'lxml':
+            return LxmlTag(etree.parse(fh, LXML_PARSER).getroot())
+        return bs4.BeautifulSoup(fh, "lxml-xml").VNCLASS
+
+
+# Same settings as the parser that BeautifulSoup uses for "lxml-xml", except
+# that comments are dropped since they are never used.
+LXML_PARSER = etree.XMLParser(recover=True, strip_cdata=False,
+                              remove_comments=True)
+
+
+class LxmlTag(object):
+
+    """Wraps an lxml element and offers the small part of the bs4.element.Tag
+    interface that the classes in this module use. This allows those classes to
+    be created from an lxml tree without building a soup. Like with bs4, using
+    a tag name as an attribute returns the first descendant with that name."""
+
+    def __init__(self, element):
+        self.element = element
+        self.name = element.tag
+
+    def __getattr__(self, tagname):
+        if tagname.startswith('__'):
+            raise AttributeError(tagname)
+        for element in self.element.iterdescendants(tagname):
+            return LxmlTag(element)
+        return None
+
+    def get(self, attribute, default=None):
+        return self.element.get(attribute, default)
+
+    def find_all(self, tagname, recursive=True):
+        if recursive:
+            elements = self.element.iterdescendants(tagname)
+        else:
+            elements = self.element.iterchildren(tagname)
+        return [LxmlTag(element) for element in elements]
+
+    @property
+    def children(self):
+        return [LxmlTag(element) for element in self.element
+                if isinstance(element.tag, str)]
+
+    @property
+    def text(self):
+        return ''.join(self.element.itertext())
+
 
 class PrettyPrinter(object):
 
@@ -25,6 +25,33 @@ $ python verbnetgl.py -f lists/motion-classes.txt
     Runs the main code, but now only on the classes listed in the file
     lists/motion-classes.txt. Results are written to html/index.html.
 
+$ python verbnetgl.py -w 8
+
+    Runs the main code, but parses the VerbNet files using a pool of 8 worker
+    processes. The results are the same as without -w. Can be combined with
+    the -d and -f options.
+
+$ python verbnetgl.py --cache
+
+    Runs the main code, but takes classes from a cache in the VerbNet directory
+    for those files that did not change since the last run with --cache. Can be
+    combined with all other options.
+
+$ python verbnetgl.py --watch
+
+    Runs the main code and then keeps watching the VerbNet directory. When files
+    are added, removed or changed the classes for those files are rebuilt and
+    the results are written again. Can be combined with all other options
+    except -t. Stop it with Ctrl-C.
+
+$ python verbnetgl.py --profile profile.json
+
+    Runs the main code and writes a JSON report with timers and counters for
+    the processing stages to profile.json. Can be combined with all other
+    options except --watch. With -w the timers and counters of the worker
+    processes are included, their timers add up the time spent in all
+    workers.
+
 $ python verbnetgl.py -t
 $ python verbnetgl.py -td
 
@@ -37,13 +64,19 @@ The code here is designed to run on Verbnet 3.3.
 
 import os
 import sys
+import time
 import getopt
 import copy
+import collections
 
 from verbnet import VerbNet
 from utils.ansi import BOLD, GREY, END
 from utils.writer import HtmlWriter
-from utils.formula import Pred, At, Have, Holds, Not, Var
+from utils.formula import Pred, At, Have, Holds, Not, Var, VariableScope
+from utils.symbols import ROLE_TYPES
+from utils.profiler import PROFILER
+from utils.members import MemberIndex
+from utils.search import SEARCH_CACHE
 from utils import ansi
 import utils.tests
 
@@ -80,63 +113,220 @@ ROLES = { 'Agent': 'Ag',
           'Topic': 'Topic' }
 
 
+# Semantic categories of frames, each with a name, the header used for the
+# category in the output and a test on a verbnet.Frame. Classes are in a
+# category if one of their frames is. Categories without a header are computed
+# but not written. New categories can be added here or with add_category() on
+# a CategoryClassifier, they all share one pass over the classes and frames.
+CATEGORIES = [
+    ('motion', 'Motion', lambda frame: frame.is_motion()),
+    ('change_of_possession', 'Change of Possession',
+     lambda frame: frame.is_change_of_possession()),
+    ('transfer_of_info', 'Change of Info',
+     lambda frame: frame.is_transfer_of_info()),
+    ('change_of_state', 'Change of State',
+     lambda frame: frame.is_change_of_state()),
+    ('cause', None, lambda frame: 'cause' in frame.predicate_index),
+    ('path_rel', None, lambda frame: 'path_rel' in frame.predicate_index) ]
+
+
 class VerbnetGL(object):
 
     """Class for enriching Verbnet with GL qualia and event structure."""
 
-    def __init__(self, debug_mode, filelist):
+    def __init__(self, debug_mode, filelist, workers=None, cache=False):
         """First read Verbnet, then transform all Verbnet classes into classes
-        enriched with GL notions."""
+        enriched with GL notions. The workers and cache arguments are handed to
+        VerbNet and determine how the Verbnet files are loaded. Nothing here uses
+        the XML trees so classes are loaded without their soups."""
         if debug_mode:
-            self.vn = VerbNet(limit=50)
+            self.vn = VerbNet(limit=50, workers=workers, cache=cache,
+                              keep_soup=False)
         elif filelist is not None:
-            self.vn = VerbNet(file_list=filelist)
+            self.vn = VerbNet(file_list=filelist, workers=workers, cache=cache,
+                              keep_soup=False)
         else:
-            self.vn = VerbNet()
+            self.vn = VerbNet(workers=workers, cache=cache, keep_soup=False)
         self.classes = []
-        for vc in self.vn.classes:
-            glvc = GLVerbClass(vc)
-            self.classes.append(glvc)
+        self.classifier = CategoryClassifier()
+        self.groups = None
+        self.member_index = None
+        with PROFILER.timer('gl_classes'):
+            for vc in self.vn.classes:
+                glvc = GLVerbClass(vc)
+                self.classes.append(glvc)
 
     def __str__(self):
         return "<VerbnetGL classes=%s>" % len(self.classes)
 
+    @property
+    def lemmas(self):
+        """The MemberIndex over the GL classes, for looking up classes by verb. The
+        index is created when first used and created again after a reload."""
+        if self.member_index is None:
+            with PROFILER.timer('member_index'):
+                self.member_index = MemberIndex(self.classes)
+        return self.member_index
+
+    def classify(self):
+        """Return a dictionary from category names to the classes in the category.
+        The classification is done once and redone after a reload. The
+        dictionary is shared, use category_classes() to get a copy of the list
+        for one category."""
+        if self.groups is None:
+            with PROFILER.timer('classify'):
+                self.groups = self.classifier.classify(self.classes)
+        return self.groups
+
+    def category_classes(self, category):
+        """Return a new list with the classes in the category."""
+        return list(self.classify()[category])
+
     def motion_classes(self):
-        return [vc for vc in self.classes if vc.is_motion()]
+        return self.category_classes('motion')
 
     def change_of_possession_classes(self):
-        return [vc for vc in self.classes if vc.is_change_of_possession()]
+        return self.category_classes('change_of_possession')
 
     def transfer_of_info_classes(self):
-        return [vc for vc in self.classes if vc.is_transfer_of_info()]
+        return self.category_classes('transfer_of_info')
 
     def change_of_state_classes(self):
-        return [vc for vc in self.classes if vc.is_change_of_state()]
+        return self.category_classes('change_of_state')
 
     def test(self):
         """Run the informal tests from the test module."""
         utils.tests.test_all(self.classes, GLVerbClass)
 
-    def write(self):
+    def write(self, class_ids=None):
         """Produce the output with motion classes, possession classes, change of state
-        classes and transfer of info classes."""
-        writer = HtmlWriter(url=VERBNET_URL, version=VERBNET_VERSION)
-        writer.write(self.motion_classes(), 'Motion')
-        writer.write(self.change_of_possession_classes(), 'Change of Possession')
-        writer.write(self.transfer_of_info_classes(), 'Change of Info')
-        writer.write(self.change_of_state_classes(), 'Change of State')
-        writer.finish()
+        classes and transfer of info classes. If class_ids is given only the
+        files for those classes and the index are written, the old files for
+        those classes are removed first so that classes that were removed or
+        are no longer in a category do not keep their files."""
+        groups = self.classify()
+        with PROFILER.timer('write_html'):
+            writer = HtmlWriter(url=VERBNET_URL, version=VERBNET_VERSION)
+            if class_ids is not None:
+                writer.remove([header for name, header in self.classifier.headers()],
+                              class_ids)
+            for name, header in self.classifier.headers():
+                writer.write(groups[name], header, class_ids)
+            writer.finish()
+
+    def reload(self):
+        """Reload the Verbnet files that changed and rebuild the GL classes for them,
+        other GL classes are not touched. Returns the changes as handed back by
+        VerbNet.reload()."""
+        changes = self.vn.reload()
+        replacements = {id(old): new for old, new in changes if old is not None}
+        classes = []
+        for glvc in self.classes:
+            if id(glvc.verbclass) not in replacements:
+                classes.append(glvc)
+            elif replacements[id(glvc.verbclass)] is not None:
+                classes.append(GLVerbClass(replacements[id(glvc.verbclass)]))
+        for old, new in changes:
+            if old is None:
+                classes.append(GLVerbClass(new))
+        self.classes = classes
+        self.groups = None
+        if changes:
+            self.member_index = None
+            # drop search results for the classes that were just replaced
+            SEARCH_CACHE.clear()
+        return changes
+
+    def watch(self, interval=1.0):
+        """Check the Verbnet files for changes every interval seconds and write the
+        classes that changed, the files of removed classes are deleted. Runs
+        until interrupted."""
+        print("Watching %s, hit Ctrl-C to stop" % self.vn.path)
+        try:
+            while True:
+                time.sleep(interval)
+                t0 = time.perf_counter()
+                try:
+                    changes = self.reload()
+                except Exception as e:
+                    # probably a file that is being edited, try again later
+                    print("Warning: reload failed (%s)" % e)
+                    continue
+                if changes:
+                    self.write([(new or old).ID for old, new in changes])
+                    for old, new in changes:
+                        status = 'added' if old is None else \
+                                 'removed' if new is None else 'changed'
+                        print("%-8s %s" % (status, (new or old).ID))
+                    print("Updated output in %.3fs" % (time.perf_counter() - t0))
+        except KeyboardInterrupt:
+            pass
 
     def print_class_roles(self):
         for vc in self.classes:
             print("%-30s\t%s" % (vc.ID, ' '.join([r.role_type for r in vc.roles])))
 
 
+class CategoryClassifier(object):
+
+    """Puts classes and frames in semantic categories in one pass over the
+    classes. Each category is assigned a bit and every GLFrame and GLVerbClass
+    gets a bitset with the categories it is in, stored in its categories
+    attribute. The bitset of a class is the union of the bitsets of its frames,
+    which is the same as what the is_motion() and similar methods do."""
+
+    def __init__(self, categories=CATEGORIES):
+        self.categories = []
+        self.bits = {}
+        for name, header, test in categories:
+            self.add_category(name, header, test)
+
+    def add_category(self, name, header, test):
+        """Add a category, test is a function that takes a verbnet.Frame and
+        returns True if the frame is in the category."""
+        if name in self.bits:
+            raise ValueError("category %s already exists" % name)
+        self.bits[name] = 1 << len(self.categories)
+        self.categories.append((name, header, test))
+
+    def headers(self):
+        """Return the names and headers of the categories that have a header."""
+        return [(name, header) for name, header, test in self.categories if header]
+
+    def names(self, bits):
+        """Return the names of the categories in a bitset."""
+        return [name for name, _, _ in self.categories if bits & self.bits[name]]
+
+    def frame_bits(self, frame):
+        """Return the bitset for a verbnet.Frame."""
+        bits = 0
+        for name, header, test in self.categories:
+            if test(frame):
+                bits |= self.bits[name]
+        return bits
+
+    def classify(self, classes):
+        """Set the bitsets on the GLVerbClasses and their GLFrames and return a
+        dictionary from category names to lists of classes, the lists keep the
+        order of the classes."""
+        groups = {name: [] for name, _, _ in self.categories}
+        for glvc in classes:
+            class_bits = 0
+            for glframe in glvc.frames:
+                glframe.categories = self.frame_bits(glframe.vnframe)
+                class_bits |= glframe.categories
+            glvc.categories = class_bits
+            for name in self.names(class_bits):
+                groups[name].append(glvc)
+        return groups
+
+
 class GLVerbClass(object):
 
     """VerbClass analogue, with an update mostly to frames"""
 
     def __init__(self, verbclass, parent=None):
+        PROFILER.count('gl_classes')
         self.ID = verbclass.ID
         self.verbclass = verbclass            # instance of verbnet.VerbClass
         self.members = verbclass.members      # keep some local references
@@ -144,6 +334,9 @@ class GLVerbClass(object):
         self.roles = []
         self.frames = []
         self.subclasses = []
+        self.categories = None                # bitset set by CategoryClassifier
+        self.role_mask = 0                    # bitmask over ROLE_TYPES
+        self.factory_cases = {}               # cases found by GLFactory classes
         self._initialize_roles(parent)
         # the frames need to be done after the roles because the roles are
         # needed when you add the oppositions to the frames
@@ -163,7 +356,7 @@ class GLVerbClass(object):
         class. Replaces any version of the parent class's role with one from the
         subclass. If there is no parent just use the roles as they are. Note
         that subclasses only specify those roles that are different from the
-        role on the parent."""
+        role on the parent. Also sets the bitmask of the role types."""
         if parent is None:
             self.roles = self.verbclass.roles
         else:
@@ -172,6 +365,18 @@ class GLVerbClass(object):
                 for (i, parentrole) in enumerate(self.roles):
                     if parentrole.role_type == role.role_type:
                         self.roles[i] = role
+        self._initialize_role_mask()
+
+    def _initialize_role_mask(self):
+        self.role_mask = 0
+        for role in self.roles:
+            self.role_mask |= 1 << role.role_type.ID
+
+    def __setstate__(self, state):
+        # symbol identifiers can be different in another process, so the role
+        # bitmask is computed again for unpickled classes
+        self.__dict__.update(state)
+        self._initialize_role_mask()
 
     def __str__(self):
         return "<GLVerbClass \"%s\" roles=%s frames=%s subclasses=%s members=%s>" \
@@ -200,8 +405,8 @@ class GLVerbClass(object):
     def has_roles(self, role_types):
         """Returns True if the role_types are all in the roles on the verb class,
         returns False otherwise."""
-        class_roles = [r.role_type for r in self.roles]
-        return set(role_types) <= set(class_roles)
+        mask = ROLE_TYPES.bitmask(role_types)
+        return mask is not None and self.role_mask & mask == mask
 
     def pp(self):
         print(bold(str(self)), "\n")
@@ -219,8 +424,11 @@ class GLFrame(object):
     from scratch (qualia, events)."""
 
     def __init__(self, glverbclass, frame):
+        PROFILER.count('gl_frames')
         self.glverbclass = glverbclass        # instance of GLVerbClass
         self.vnframe = frame                  # instance of verbnet.Frame
+        self.categories = None                # bitset set by CategoryClassifier
+        self.variables = VariableScope()      # names for unbound variables
         self.subcat = Subcat(self)
         self.qualia = Qualia(self)
         self.events = EventStructure(self)
@@ -239,15 +447,17 @@ class GLFrame(object):
         # Use an auxiliary dictionary that has mappings from role names to
         # variables, taken from the subcat frame.
         self.role2var = self.subcat.get_variables()
-        # For each frame, we restart unbound variable numbering.
-        Var.reset_unbound_variable_count()
         # TODO: need to decide whether the groups of frames we do this for are
         # disjoint or not, for now we assume they are and that seems to be
         # correct for the groups we use as of May 2020.
         if self.vnframe.is_motion():
-            GLMotionFactory(self).make()
+            PROFILER.count('frames_enriched_motion')
+            with PROFILER.timer('factory_motion'):
+                GLMotionFactory(self).make()
         elif self.vnframe.is_change_of_possession():
-            GLChangeOfPossessionFactory(self).make()
+            PROFILER.count('frames_enriched_change_of_possession')
+            with PROFILER.timer('factory_change_of_possession'):
+                GLChangeOfPossessionFactory(self).make()
 
     def get_moving_objects(self):
         """Return the moving objects as Role instances. The object role typically
@@ -285,7 +495,7 @@ class GLFrame(object):
         subcat."""
         var = self.role2var.get(rolename)
         if var is None:
-            var = Var.get_unbound_variable()
+            var = self.variables.get_unbound_variable()
         return Role(rolename, var)
 
     def pp_predicates(self, indent=0):
@@ -329,7 +539,9 @@ class Subcat(object):
 
     """Class that contains the GL subcategorisation for the frame, which is
     basically taken from the Verbnet frame except that it adds variables to some
-    of the subcat elements."""
+    of the subcat elements. The signature is the sequence of category and role
+    pairs of the elements, where the role is a string and 'None' for elements
+    without a role, and the multiset counts the pairs in the signature."""
 
     def __init__(self, glframe):
         """Creates the subcat frame structure with unique variables assigned to
@@ -347,6 +559,8 @@ class Subcat(object):
                 # use the abrreviation of the role as the variable name
                 var = ROLES.get(synrole.value, synrole.value)
                 self.members.append(SubcatElement(var, synrole))
+        self.signature = tuple((m.cat, str(m.role)) for m in self.members)
+        self.multiset = collections.Counter(self.signature)
 
     def __iter__(self):
         return iter(self.members)
@@ -372,6 +586,8 @@ class SubcatElement(object):
     Note that self.role is a string, usually with one role like 'Agent', but
     also a list of prepositions like 'from out_of'."""
 
+    __slots__ = ('var', 'cat', 'role', 'restrictions')
+
     def __init__(self, var, synrole):
         self.var = var
         self.cat = synrole.pos
@@ -419,9 +635,11 @@ class EventStructure(object):
         return ', '.join([str(f) for f in self.formulas])
 
     def add(self, formula):
+        PROFILER.count('formulas')
         self.formulas.append(formula)
 
     def add_multiple(self, formulas):
+        PROFILER.count('formulas', len(formulas))
         self.formulas.extend(formulas)
 
     def pp(self, indent=0):
@@ -451,10 +669,12 @@ class Qualia(object):
 
     def add(self, formula):
         """Add a formula to the qualia."""
+        PROFILER.count('formulas')
         self.formulas.append(formula)
 
     def add_multiple(self, formulas):
         """Add multiple formulas to the qualia."""
+        PROFILER.count('formulas', len(formulas))
         self.formulas.extend(formulas)
 
     def html(self):
@@ -484,14 +704,17 @@ class GLFactory(object):
     @classmethod
     def determine_case(cls, glframe):
         """Determine which of the cases in the cases class variable applies for this
-        frame. The first one that matches is returned."""
-        # TODO: it is a bit redundant that this is done for each frame while the
-        # roles are on the verbclass, refactor this.
-        cases = []
-        for role_types in cls.cases:
-            if glframe.glverbclass.has_roles(role_types):
-                return role_types
-        return None
+        frame. The first one that matches is returned. Cases only depend on the
+        roles of the verb class, so the case is stored on the verb class and
+        only determined for its first frame."""
+        glverbclass = glframe.glverbclass
+        if cls not in glverbclass.factory_cases:
+            glverbclass.factory_cases[cls] = None
+            for role_types in cls.cases:
+                if glverbclass.has_roles(role_types):
+                    glverbclass.factory_cases[cls] = role_types
+                    break
+        return glverbclass.factory_cases[cls]
 
     def __init__(self, glframe):
         self.glframe = glframe
@@ -585,7 +808,7 @@ class GLMotionFactory(GLFactory):
         for obj in moving_objects:
             at1 = At(Var(obj.var), Var(initial_location.var))
             at2 = At(Var(obj.var), Var(destination.var))
-            path_var = Var(Var.get_unbound_variable())
+            path_var = Var(self.glframe.variables.get_unbound_variable())
             qualia.add( Opposition(at1, Not(at1)) )
             qualia.add( Opposition(Not(at2), at2) )
             qualia.add( Pred('path', [path_var, Var(obj.var), Var(trajectory.var)]) )
@@ -613,7 +836,7 @@ class GLMotionFactory(GLFactory):
         for obj in moving_objects:
             at1 = At(Var(obj.var), Var(source.var))
             at2 = At(Var(obj.var), Var(goal.var))
-            path_var = Var(Var.get_unbound_variable())
+            path_var = Var(self.glframe.variables.get_unbound_variable())
             qualia.add( Opposition(at1, Not(at1)) )
             qualia.add( Opposition(Not(at2), at2) )
             qualia.add( Pred('path', [path_var, Var(obj.var), Var(trajectory.var)]) )
@@ -687,7 +910,12 @@ def read_options():
     debug_mode = False
     filelist = None
     run_tests = False
-    opts, arg = getopt.getopt(sys.argv[1:], 'dtf:c:', [])
+    workers = None
+    cache = False
+    watch = False
+    profile = None
+    opts, arg = getopt.getopt(sys.argv[1:], 'dtf:c:w:',
+                              ['cache', 'watch', 'profile='])
     for opt, arg in opts:
         if opt == '-t':
             run_tests = True
@@ -695,7 +923,15 @@ def read_options():
             debug_mode = True
         if opt == '-f':
             filelist = arg
-    return debug_mode, filelist, run_tests
+        if opt == '-w':
+            workers = int(arg)
+        if opt == '--cache':
+            cache = True
+        if opt == '--watch':
+            watch = True
+        if opt == '--profile':
+            profile = arg
+    return debug_mode, filelist, run_tests, workers, cache, watch, profile
 
 
 def bold(text):
@@ -712,12 +948,24 @@ def ul(text):
 
 if __name__ == '__main__':
 
-    debug_mode, filelist, run_tests = read_options()
-    vngl = VerbnetGL(debug_mode, filelist)
+    options = read_options()
+    (debug_mode, filelist, run_tests, workers,
+     cache, watch, profile) = options
+    if profile is not None:
+        PROFILER.enable()
+
+    with PROFILER.timer('total'):
+        vngl = VerbnetGL(debug_mode, filelist, workers, cache)
+        if run_tests:
+            vngl.test()
+        else:
+            vngl.write()
+
+    if profile is not None:
+        PROFILER.write(profile)
+        print("Profile written to %s" % profile)
 
-    if run_tests:
-        vngl.test()
-    else:
-        vngl.write()
+    if watch and not run_tests:
+        vngl.watch()
 
     # vngl.print_class_roles()